@@ -0,0 +1,7 @@
+# auto_sign_backend/__main__.py
+# python -m auto_sign_backend <子命令>，见 cli.py
+import sys
+
+from auto_sign_backend.cli import main
+
+sys.exit(main())
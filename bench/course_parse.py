@@ -0,0 +1,91 @@
+# auto_sign_backend/bench/course_parse.py
+# 微基准：学期规模的合成课表，对比旧的 dict + strptime 流程与 Course 一次解析的耗时和内存
+# 用法: python -m auto_sign_backend.bench.course_parse [--weeks 20] [--per-day 6] [--repeat 5]
+import copy
+import random
+import argparse
+import timeit
+import tracemalloc
+from datetime import datetime, timedelta
+
+from auto_sign_backend.logic.course import parse_courses
+from auto_sign_backend.stub import fixtures
+from auto_sign_backend.utils.coords import parse_coord
+
+BEFORE_MIN, AFTER_MIN = 5, 30
+FAKE_LON, FAKE_LAT = 116.397451, 39.909187
+
+
+def semester(weeks: int, per_day: int, seed: int = 0) -> dict:
+    rng = random.Random(seed)
+    start = datetime(2025, 9, 1)
+    rows = []
+    for d in range(weeks * 7):
+        day = start + timedelta(days=d)
+        if day.weekday() >= 5:
+            continue
+        t = day.replace(hour=8)
+        for i in range(per_day):
+            c = fixtures.make_course(f"{day:%Y%m%d}{i:02d}", t, t + timedelta(minutes=95), f"课程{i}")
+            if rng.random() < 0.3:
+                c["classroomLongitude"] = "null"
+            rows.append(c)
+            t += timedelta(minutes=110)
+    return fixtures.course_sched(rows)
+
+
+def legacy(sched: dict, ticks: int) -> list:
+    """旧流程：strptime 解析、原地写 sign_begin/sign_end，每轮循环再解析一次经纬度"""
+    out = []
+    for c in sched["result"]:
+        c = dict(c)
+        begin = datetime.strptime(c["classBeginTime"], "%Y-%m-%d %H:%M:%S")
+        end = datetime.strptime(c["classEndTime"], "%Y-%m-%d %H:%M:%S")
+        c["sign_begin"] = begin - timedelta(minutes=BEFORE_MIN)
+        c["sign_end"] = end + timedelta(minutes=AFTER_MIN)
+        out.append(c)
+    for _ in range(ticks):
+        for c in out:
+            parse_coord(c.get("classroomLongitude"), FAKE_LON)
+            parse_coord(c.get("classroomLatitude"), FAKE_LAT)
+    return out
+
+
+def current(sched: dict, ticks: int) -> list:
+    out = parse_courses(sched, BEFORE_MIN, AFTER_MIN, FAKE_LON, FAKE_LAT)
+    for _ in range(ticks):
+        for c in out:
+            c.longitude, c.latitude
+    return out
+
+
+def measure_memory(fn, sched: dict) -> int:
+    data = copy.deepcopy(sched)
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = fn(data, 0)
+    size = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    return size
+
+
+def main():
+    ap = argparse.ArgumentParser(description="课程解析微基准")
+    ap.add_argument("--weeks", type=int, default=20)
+    ap.add_argument("--per-day", type=int, default=6)
+    ap.add_argument("--ticks", type=int, default=10, help="模拟旧轮询循环里重复解析经纬度的轮数")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    sched = semester(args.weeks, args.per_day)
+    n = len(sched["result"])
+    print(f"合成课表: {n} 节课（{args.weeks} 周 × 每天 {args.per_day} 节）")
+    for label, fn in (("legacy dict+strptime", legacy), ("Course.parse", current)):
+        t = min(timeit.repeat(lambda: fn(sched, args.ticks), number=1, repeat=args.repeat))
+        mem = measure_memory(fn, sched)
+        print(f"  {label:<22} {t * 1000:8.2f} ms  {t / n * 1e6:6.2f} us/节  内存 {mem / 1024:8.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+# auto_sign_backend/bench/simulate_day.py
+# 虚拟时钟模拟：用 SimulatedClock + 离线 client 把整天（或成千上万个合成日）的课表端到端跑一遍，
+# 检查每门课都在窗口内签到，并统计调度开销
+# 用法: python -m auto_sign_backend.bench.simulate_day [--days 1000] [--seed 0]
+import time
+import random
+import logging
+import argparse
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from auto_sign_backend.run import load_config, run_auto_sign
+from auto_sign_backend.stub import fixtures
+from auto_sign_backend.stub.fake_client import FakeIClassClient
+from auto_sign_backend.utils.clock import SimulatedClock
+from auto_sign_backend.utils.time_utils import parse_time
+
+BEFORE_MIN, AFTER_MIN = 5, 30
+
+
+def synthetic_day(day: datetime, rng: random.Random) -> List[Dict[str, Any]]:
+    """随机生成一天的课表：3~8 节课，45/95 分钟，约一半是课间 5~15 分钟的连堂课"""
+    courses = []
+    t = day.replace(hour=8, minute=0, second=0, microsecond=0)
+    for i in range(rng.randint(3, 8)):
+        length = rng.choice((45, 95))
+        courses.append(fixtures.make_course(f"{day:%Y%m%d}{i:02d}", t, t + timedelta(minutes=length), f"课程{i}"))
+        t += timedelta(minutes=length + (rng.randint(5, 15) if rng.random() < 0.5 else rng.randint(30, 180)))
+        if t.date() != day.date() or t.hour >= 21:
+            break
+    return courses
+
+
+def reschedule(courses: List[Dict[str, Any]], day: datetime, rng: random.Random) -> Tuple[datetime, List[Dict[str, Any]]]:
+    """当天 7 点前后调课：最后一节课推后 1~2 小时，另外加一节晚课（不超过 23 点）"""
+    revised = [dict(c) for c in courses]
+    last = revised[-1]
+    shift = timedelta(minutes=rng.randint(60, 120))
+    begin, end = parse_time(last["classBeginTime"]) + shift, parse_time(last["classEndTime"]) + shift
+    last.update(classBeginTime=begin.strftime("%Y-%m-%d %H:%M:%S"), classEndTime=end.strftime("%Y-%m-%d %H:%M:%S"))
+    extra_begin = max(end + timedelta(minutes=rng.randint(5, 30)), day.replace(hour=19))
+    if extra_begin.date() == day.date() and extra_begin.hour < 22:
+        revised.append(fixtures.make_course(f"{day:%Y%m%d}99", extra_begin, extra_begin + timedelta(minutes=45), "调课"))
+    return day.replace(hour=7, minute=rng.randint(0, 59)), revised
+
+
+def simulate(courses: List[Dict[str, Any]], day: datetime, cfg: dict,
+             revision: Optional[Tuple[datetime, List[Dict[str, Any]]]] = None) -> Dict[str, Any]:
+    clock = SimulatedClock(day.replace(hour=0, minute=0, second=0, microsecond=0))
+    client = FakeIClassClient(clock, courses, BEFORE_MIN, AFTER_MIN, revisions=[revision] if revision else None)
+    if revision:
+        courses = revision[1]
+    t0 = time.perf_counter()
+    run_auto_sign(cfg, client=client, clock=clock)
+    wall_ms = (time.perf_counter() - t0) * 1000
+
+    signed_at = {s["payload"]["courseSchedId"]: s["t"] for s in client.signs}
+    lateness, missed = [], []
+    for c in courses:
+        begin = parse_time(c["classBeginTime"]) - timedelta(minutes=BEFORE_MIN)
+        end = parse_time(c["classEndTime"]) + timedelta(minutes=AFTER_MIN)
+        t = signed_at.get(c["courseSchedId"])
+        if t is None or not begin <= t <= end:
+            missed.append(c["courseSchedId"])
+        else:
+            lateness.append((t - begin).total_seconds())
+    return {"wall_ms": wall_ms, "lateness": lateness, "missed": missed,
+            "duplicates": len(client.signs) - len(signed_at), "sim_hours": clock.advanced_sec / 3600}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="虚拟时钟下的整日签到模拟")
+    ap.add_argument("--days", type=int, default=1)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--changes", type=float, default=0.2, help="发生当天调课的天数比例")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+    rng = random.Random(args.seed)
+    cfg = load_config()
+    # 虚拟时钟只能由调度线程推进，签到也放在调度线程里做
+    cfg.update({"password": cfg["password"] or "sim", "dry_run": False, "log_file": None,
+                "session_cache_file": None, "schedule_db": None, "journal_file": None, "sign_workers": 0})
+
+    day = datetime(2025, 9, 1)
+    n_courses, walls, late, missed, dups, sim_h, changed = 0, [], [], 0, 0, 0.0, 0
+    for i in range(args.days):
+        d = day + timedelta(days=i)
+        courses = synthetic_day(d, rng)
+        revision = reschedule(courses, d, rng) if rng.random() < args.changes else None
+        r = simulate(courses, d, cfg, revision)
+        n_courses += len(revision[1] if revision else courses)
+        changed += revision is not None
+        walls.append(r["wall_ms"])
+        late.extend(r["lateness"])
+        missed += len(r["missed"])
+        dups += r["duplicates"]
+        sim_h += r["sim_hours"]
+
+    walls.sort()
+    print(f"模拟 {args.days} 天 / {n_courses} 门课（虚拟时间 {sim_h:.1f} 小时，其中 {changed} 天调课）")
+    print(f"  每天耗时: p50 {walls[len(walls) // 2]:.2f} ms, max {walls[-1]:.2f} ms, 合计 {sum(walls):.0f} ms")
+    print(f"  签到时刻晚于窗口打开: max {max(late) if late else 0:.3f} s")
+    print(f"  漏签 {missed} 门，重复签到 {dups} 次")
+    if missed or dups:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
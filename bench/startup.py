@@ -0,0 +1,95 @@
+# auto_sign_backend/bench/startup.py
+# 基准：用 python -X importtime 跑各个子命令，统计启动耗时、import 耗时和加载的模块，
+# 只读本地数据的命令（--help、plan --offline、log-stats）不应加载 requests / urllib3
+# 用法: python -m auto_sign_backend.bench.startup [--repeat 5] [--budget-ms 300]
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import tempfile
+from typing import Dict, List
+
+PKG_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PKG = os.path.basename(PKG_DIR)
+HEAVY = ("requests", "urllib3")
+
+_IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> Dict:
+    """-X importtime 的输出：总 import 耗时（顶层模块的累计之和）和加载的模块名"""
+    total_us = 0
+    modules: List[str] = []
+    for line in stderr.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if not m:
+            continue
+        modules.append(m.group(4))
+        if not m.group(3):
+            total_us += int(m.group(2))
+    return {"import_ms": total_us / 1000, "modules": modules}
+
+
+def run_case(argv: List[str], env: Dict[str, str], cwd: str) -> Dict:
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *argv], env=env, cwd=cwd,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding="utf-8",
+                          errors="replace")
+    wall_ms = (time.perf_counter() - t0) * 1000
+    out = parse_importtime(proc.stderr)
+    out.update(wall_ms=wall_ms, rc=proc.returncode,
+               heavy=sorted({m.split(".")[0] for m in out["modules"]} & set(HEAVY)))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description="子命令启动耗时 / import 基准")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget-ms", type=float, default=300.0, help="只读本地数据的命令启动耗时（中位数）上限")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cfg_file = os.path.join(tmp, "config.json")
+        with open(cfg_file, "w", encoding="utf-8") as f:
+            json.dump({"schedule_db": os.path.join(tmp, "schedule.db"), "log_file": None,
+                       "session_cache_file": None, "journal_file": None}, f)
+        log_file = os.path.join(tmp, "auto_sign.log")
+        with open(log_file, "w", encoding="utf-8") as f:
+            f.write("2024-01-01 08:00:00,000 [INFO] 今天没有课程\n")
+
+        env = dict(os.environ, PYTHONPATH=os.path.dirname(PKG_DIR))
+        env.pop("AUTO_SIGN_CONFIG", None)
+        # (名称, 参数, 是否只读本地数据)
+        cases = [
+            ("--help", ["-m", PKG, "--help"], True),
+            ("plan --offline", ["-m", PKG, "-c", cfg_file, "plan", "--offline", "--days", "7"], True),
+            ("log-stats", ["-m", PKG, "-c", cfg_file, "log-stats", log_file], True),
+            ("import run", ["-c", f"import {PKG}.run"], False),
+        ]
+
+        print(f"{'case':<18}{'wall ms':>10}{'import ms':>11}{'modules':>9}  heavy")
+        failed = []
+        for name, argv, local_only in cases:
+            runs = [run_case(argv, env, tmp) for _ in range(args.repeat)]
+            wall = statistics.median(r["wall_ms"] for r in runs)
+            imp = statistics.median(r["import_ms"] for r in runs)
+            heavy = runs[0]["heavy"]
+            print(f"{name:<18}{wall:>10.1f}{imp:>11.1f}{len(runs[0]['modules']):>9}  {','.join(heavy) or '-'}")
+            if any(r["rc"] for r in runs):
+                failed.append(f"{name}: 退出码 {runs[0]['rc']}")
+            if local_only and heavy:
+                failed.append(f"{name}: 加载了 {', '.join(heavy)}")
+            if local_only and wall > args.budget_ms:
+                failed.append(f"{name}: 启动 {wall:.1f} ms 超过 {args.budget_ms:.0f} ms")
+
+    for msg in failed:
+        print("FAIL", msg)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
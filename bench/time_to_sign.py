@@ -0,0 +1,91 @@
+# auto_sign_backend/bench/time_to_sign.py
+# 基准：对本地替身服务跑完整的 run_auto_sign，统计各故障配置下的 time-to-sign
+# 用法: python -m auto_sign_backend.bench.time_to_sign [--profile flaky --profile slow] [--repeat 3] [--overlap 3]
+import time
+import logging
+import argparse
+import threading
+import statistics
+from datetime import datetime, timedelta
+
+from auto_sign_backend.run import load_config, make_clock, run_auto_sign
+from auto_sign_backend.stub import fixtures
+from auto_sign_backend.stub.server import PROFILES, StubServer
+from auto_sign_backend.utils.http_retry import remove_request_hook
+from auto_sign_backend.utils.server_clock import ServerTimeClock
+from auto_sign_backend.utils.time_utils import parse_time
+
+
+def run_once(profile: str, lead_sec: float, seed: int, timeout: float, skew: float = 0.0,
+             server_clock: bool = True, overlap: int = 1) -> dict:
+    # 课表按服务器时间生成；skew 非 0 时本机时钟与服务器不一致；overlap 门课的窗口同时打开
+    courses = fixtures.courses_opening_in(lead_sec, before_min=5, count=overlap,
+                                          now=datetime.now() + timedelta(seconds=skew))
+    sign_begin = parse_time(courses[0]["classBeginTime"]) - timedelta(minutes=5)
+
+    with StubServer(courses, PROFILES[profile], seed=seed, clock_skew=skew) as srv:
+        cfg = load_config()
+        cfg.update({
+            "base_url": srv.base_url,
+            "ve_base_url": srv.base_url,
+            "sign_url": srv.sign_url,
+            "password": cfg["password"] or "stub",
+            "dry_run": False,
+            "log_file": None,
+            "session_cache_file": None,
+            "schedule_db": None,
+            "journal_file": None,
+            "prewarm_lead_sec": max(0.5, min(cfg["prewarm_lead_sec"], lead_sec - 0.5)),
+            "retry_backoff": 0.2,
+            "server_clock": server_clock,
+        })
+        clock = make_clock(cfg)
+        t = threading.Thread(target=run_auto_sign, args=(cfg,), kwargs={"clock": clock}, daemon=True)
+        t.start()
+        t.join(timeout)
+        if isinstance(clock, ServerTimeClock):
+            remove_request_hook(clock.estimator.on_request)
+        with srv.state.lock:
+            signs = list(srv.state.signs)
+            hits = dict(srv.state.hits)
+
+    signed_ids = {s["payload"].get("courseSchedId") for s in signs}
+    return {
+        "profile": profile,
+        "signed": len(signed_ids) == len(courses),
+        "time_to_sign_ms": (signs[0]["t"] - sign_begin.timestamp()) * 1000 if signs else None,
+        "last_sign_ms": (signs[-1]["t"] - sign_begin.timestamp()) * 1000 if signs else None,
+        "sign_attempts": hits.get("stu_auto_sign", 0),
+        "finished": not t.is_alive(),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="run_auto_sign 对替身服务的 time-to-sign 基准")
+    ap.add_argument("--profile", action="append", choices=sorted(PROFILES), help="可多次指定，默认全部")
+    ap.add_argument("--repeat", type=int, default=1)
+    ap.add_argument("--lead", type=float, default=2.0, help="启动后多少秒签到窗口打开")
+    ap.add_argument("--timeout", type=float, default=60.0)
+    ap.add_argument("--skew", type=float, default=0.0, help="替身服务器时钟比本机快多少秒（可为负）")
+    ap.add_argument("--local-clock", action="store_true", help="不估计服务器时钟偏差，按本机时间触发")
+    ap.add_argument("--overlap", type=int, default=1, help="同时打开签到窗口的课程数（连堂课 / 晚启动）")
+    ap.add_argument("-v", "--verbose", action="store_true")
+    args = ap.parse_args()
+
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.CRITICAL)
+
+    print(f"{'profile':<16}{'signed':>8}{'p50 ms':>10}{'max ms':>10}{'last ms':>10}{'sign POSTs':>12}")
+    for profile in args.profile or sorted(PROFILES):
+        runs = [run_once(profile, args.lead, seed, args.timeout, args.skew, not args.local_clock, args.overlap)
+                for seed in range(args.repeat)]
+        tts = [r["time_to_sign_ms"] for r in runs if r["time_to_sign_ms"] is not None]
+        p50 = f"{statistics.median(tts):.1f}" if tts else "-"
+        worst = f"{max(tts):.1f}" if tts else "-"
+        lasts = [r["last_sign_ms"] for r in runs if r["last_sign_ms"] is not None]
+        last = f"{max(lasts):.1f}" if lasts else "-"
+        print(f"{profile:<16}{sum(r['signed'] for r in runs):>5}/{len(runs):<2}{p50:>10}{worst:>10}{last:>10}"
+              f"{sum(r['sign_attempts'] for r in runs):>12}")
+
+
+if __name__ == "__main__":
+    main()
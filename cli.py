@@ -0,0 +1,201 @@
+# auto_sign_backend/cli.py
+# 命令行入口：python -m auto_sign_backend <子命令>
+# 顶层只导入标准库和 config；requests / urllib3 这些重依赖在子命令真正要联网时才导入，
+# plan --offline、log-stats 这类只读本地数据的命令不会加载网络栈
+import sys
+import logging
+import argparse
+from datetime import datetime
+from typing import List, Optional
+
+from auto_sign_backend.config import load_config, parse_overrides
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+
+logger = logging.getLogger("auto_sign")
+
+
+def _setup_logging(cfg: dict) -> None:
+    from auto_sign_backend.utils.log_setup import setup_logging
+    setup_logging(cfg["log_file"], cfg["log_json"], cfg["log_max_bytes"], cfg["log_backup_count"])
+
+
+def run_plan(cfg: dict, days: int, ics_file: Optional[str] = None, client=None, clock: Clock = REAL_CLOCK,
+             offline: bool = False):
+    """
+    加载从今天起 days 天的课程表（先尽量拉取到本地缓存，登录失败时只用缓存；offline 时不联网），
+    打印当前可签 / 下一个窗口 / 连堂课冲突，可选导出 iCalendar
+    """
+    from auto_sign_backend.logic.planner import load_term
+    from auto_sign_backend.store.schedule_store import ScheduleStore
+
+    if not cfg.get("schedule_db"):
+        logger.error("未配置 schedule_db，无法加载学期课程表")
+        return None
+    store = ScheduleStore(cfg["schedule_db"])
+    now = clock.now()
+    if not offline:
+        from auto_sign_backend.run import make_client
+        from auto_sign_backend.store.schedule_store import prefetch
+        client = client or make_client(cfg, clock)
+        try:
+            client.ensure_login(cfg["phone"], cfg["password"])
+            prefetch(client, store, days, start=now)
+        except Exception as e:
+            logger.warning("登录或拉取课程表失败，只使用本地缓存: %s", e)
+
+    before_min, after_min = store.get_sign_time() or (cfg["before_minute_default"], cfg["after_minute_default"])
+    planner = load_term(store, now.replace(hour=0, minute=0, second=0, microsecond=0), days,
+                        before_min, after_min, cfg["fake_longitude"], cfg["fake_latitude"])
+    st = planner.status(now)
+    logger.info("签到计划：%d 天共 %d 个窗口，未结束 %d 个", days, st["total"], st["pending"])
+    for c in st["active"]:
+        logger.info("当前可签: %s (%s) %s ~ %s", c["name"], c["classroom"], c["sign_begin"], c["sign_end"])
+    for c in st["next"]:
+        logger.info("下一个窗口: %s (%s) %s ~ %s", c["name"], c["classroom"], c["sign_begin"], c["sign_end"])
+    for group in planner.conflicts():
+        logger.info("窗口重叠（连堂课）: %s", "、".join(f"{c.name}@{c.begin:%m-%d %H:%M}" for c in group))
+    if ics_file:
+        with open(ics_file, "w", encoding="utf-8", newline="") as f:
+            f.write(planner.to_ical(clock=clock))
+        logger.info("已导出 iCalendar: %s", ics_file)
+    return planner
+
+
+def cmd_run(cfg: dict, args) -> int:
+    """run / dry-run：签到（常驻或跑完今天），连带通知、状态服务、指标和剖析"""
+    from auto_sign_backend.run import make_clock, make_notifier, run_auto_sign, run_daemon
+    from auto_sign_backend.utils.http_retry import add_request_hook
+    from auto_sign_backend.utils.metrics import REGISTRY
+    from auto_sign_backend.utils.profiling import PhaseProfiler, NO_PROFILER
+
+    _setup_logging(cfg)
+    metrics_on = cfg.get("metrics_prom_file") or cfg.get("metrics_json_file")
+    if metrics_on:
+        add_request_hook(REGISTRY.on_request)
+
+    profiler = NO_PROFILER
+    if args.profile or args.trace_malloc:
+        profiler = PhaseProfiler(cfg["profile_dir"], args.profile, args.trace_malloc, cfg["profile_top"])
+        profiler.report_startup()
+
+    clock = make_clock(cfg)
+    notifier = None if cfg["dry_run"] else make_notifier(cfg)
+    board = server = None
+    if cfg.get("status_port"):
+        from auto_sign_backend.utils.status_server import StatusBoard, StatusServer
+        board = StatusBoard()
+        add_request_hook(board.on_request)
+        if not metrics_on:
+            add_request_hook(REGISTRY.on_request)
+        server = StatusServer(board, cfg["status_host"], cfg["status_port"]).start()
+    ok = True
+    try:
+        if args.daemon:
+            run_daemon(cfg, clock=clock, notifier=notifier, status=board, profiler=profiler)
+        else:
+            ok = run_auto_sign(cfg, clock=clock, notifier=notifier, status=board, profiler=profiler)
+    except KeyboardInterrupt:
+        print("\n签到程序已手动停止，祝你好运~")
+        logger.info("程序被手动终止")
+    finally:
+        if server is not None:
+            server.stop()
+        if notifier is not None:
+            notifier.close()
+        if metrics_on:
+            REGISTRY.dump(cfg.get("metrics_prom_file"), cfg.get("metrics_json_file"))
+    return 0 if ok else 1
+
+
+def cmd_dry_run(cfg: dict, args) -> int:
+    """走完登录、取课表、排窗口的全流程，但不发签到请求，也不写签到日志、不推送"""
+    cfg.update(dry_run=True, journal_file=None)
+    return cmd_run(cfg, args)
+
+
+def cmd_plan(cfg: dict, args) -> int:
+    _setup_logging(cfg)
+    planner = run_plan(cfg, args.days or cfg["plan_days"], args.ics, offline=args.offline)
+    return 0 if planner is not None else 1
+
+
+def cmd_check_login(cfg: dict, args) -> int:
+    """登录（默认复用缓存会话）并拉一次今日课程表，确认会话真的可用"""
+    from auto_sign_backend.run import make_client
+
+    _setup_logging(cfg)
+    client = make_client(cfg)
+    try:
+        if args.fresh:
+            client.login(cfg["phone"], cfg["password"])
+            cached = False
+        else:
+            cached = bool(client.ensure_login(cfg["phone"], cfg["password"]).get("_cached"))
+        sched = client.get_course_sched(datetime.now().strftime("%Y%m%d"))
+    except Exception as e:
+        logger.error("登录检查失败: %s", e)
+        return 1
+    rows = sched.get("result") if isinstance(sched, dict) else None
+    logger.info("登录正常（%s），userId=%s，今日课程 %d 门", "缓存会话" if cached else "新登录", client.user_id,
+                len(rows) if isinstance(rows, list) else 0)
+    return 0
+
+
+def cmd_log_stats(cfg: dict, args) -> int:
+    from auto_sign_backend.utils.log_stats import analyze, format_report
+
+    since = datetime.strptime(args.since, "%Y-%m-%d") if args.since else None
+    until = datetime.strptime(args.until, "%Y-%m-%d") if args.until else None
+    print(format_report(analyze(args.logs or [cfg["log_file"]], since, until)))
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    ap = argparse.ArgumentParser(prog="python -m auto_sign_backend", description="iClass 自动签到")
+    ap.add_argument("-c", "--config", help="配置文件（JSON），默认取环境变量 AUTO_SIGN_CONFIG")
+    ap.add_argument("-s", "--set", action="append", default=[], metavar="KEY=VALUE",
+                    help="覆盖单个配置项，可多次指定，如 -s status_port=9100")
+    sub = ap.add_subparsers(dest="command", metavar="<命令>", required=True)
+
+    def sign_options(p):
+        p.add_argument("--daemon", action="store_true", help="常驻模式：跨天运行，每天自动重建签到窗口")
+        p.add_argument("--profile", action="store_true", help="对启动阶段和每次签到做 cProfile 剖析")
+        p.add_argument("--trace-malloc", action="store_true",
+                       help="用 tracemalloc 记录启动阶段和每次签到的内存分配（配合 python -X tracemalloc 可看到 import 阶段）")
+
+    p = sub.add_parser("run", help="自动签到（默认跑完今天）")
+    sign_options(p)
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("dry-run", help="完整走一遍签到流程但不发签到请求")
+    sign_options(p)
+    p.set_defaults(func=cmd_dry_run)
+
+    p = sub.add_parser("plan", help="查看签到计划（默认一学期），不签到")
+    p.add_argument("--days", type=int, help="加载的天数，默认取配置 plan_days")
+    p.add_argument("--ics", help="导出 iCalendar 文件")
+    p.add_argument("--offline", action="store_true", help="不登录、不拉取，只用本地缓存的课程表")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser("check-login", help="检查账号能否登录、会话是否可用")
+    p.add_argument("--fresh", action="store_true", help="忽略缓存的会话，重新登录")
+    p.set_defaults(func=cmd_check_login)
+
+    p = sub.add_parser("log-stats", help="统计历史日志的签到延迟分位数和接口重试 / 失败")
+    p.add_argument("logs", nargs="*", metavar="LOG", help="日志文件，默认 log_file 及其轮转文件")
+    p.add_argument("--since", help="只统计该日期（YYYY-MM-DD）及之后的日志")
+    p.add_argument("--until", help="只统计该日期（YYYY-MM-DD）之前的日志")
+    p.set_defaults(func=cmd_log_stats, needs_password=False)
+    return ap
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    needs_password = getattr(args, "needs_password", True) and not getattr(args, "offline", False)
+    try:
+        cfg = load_config(args.config, parse_overrides(args.set), require_password=needs_password)
+    except (ValueError, OSError) as e:
+        # 配置文件不存在 / 不是合法 JSON、AUTO_SIGN_* 或 -s 的值类型不对
+        print(f"配置错误: {e}", file=sys.stderr)
+        return 2
+    return args.func(cfg, args)
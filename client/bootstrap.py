@@ -0,0 +1,76 @@
+# auto_sign_backend/client/bootstrap.py
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable
+
+from auto_sign_backend.client.iclass_client import IClassClient
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BootstrapResult:
+    """启动阶段各接口的结果、异常与耗时（毫秒）"""
+    results: Dict[str, Any] = field(default_factory=dict)
+    errors: Dict[str, Exception] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    total_ms: float = 0.0
+
+    def ok(self, stage: str) -> bool:
+        return stage in self.results
+
+    def get(self, stage: str, default: Any = None) -> Any:
+        return self.results.get(stage, default)
+
+
+def _timed(fn: Callable[[], Any]):
+    t0 = time.perf_counter()
+    try:
+        return fn(), None, (time.perf_counter() - t0) * 1000
+    except Exception as e:
+        return None, e, (time.perf_counter() - t0) * 1000
+
+
+def bootstrap(client: IClassClient, phone: str, password: str, date_str: str, max_workers: int = 4,
+              skip: Iterable[str] = ()) -> BootstrapResult:
+    """
+    并发启动：getQxktSignTime 不依赖登录，与 login 同时发出（有缓存会话时 login 不发请求）；
+    登录成功后课程表、socket_info 再并发发出。
+    总耗时约等于 max(login, qxkt) + max(课程表, socket_info)，而不是全部相加。
+    login 失败时只返回已完成的部分，由调用方决定是否继续。
+    skip 中的阶段（如本地已有缓存的 course_sched/qxkt_sign_time）不发请求。
+    """
+    skip = set(skip)
+    res = BootstrapResult()
+    t0 = time.perf_counter()
+
+    def record(stage, fut):
+        value, err, ms = fut.result()
+        res.timings[stage] = ms
+        if err is None:
+            res.results[stage] = value
+        else:
+            res.errors[stage] = err
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bootstrap") as pool:
+        qxkt_fut = None if "qxkt_sign_time" in skip else pool.submit(_timed, client.get_qxkt_sign_time)
+        record("login", pool.submit(_timed, lambda: client.ensure_login(phone, password)))
+
+        if res.ok("login"):
+            futs = {
+                "course_sched": lambda: client.get_course_sched(date_str),
+                "socket_info": client.get_socket_info,
+            }
+            futs = {stage: pool.submit(_timed, fn) for stage, fn in futs.items() if stage not in skip}
+            for stage, fut in futs.items():
+                record(stage, fut)
+        if qxkt_fut is not None:
+            record("qxkt_sign_time", qxkt_fut)
+
+    res.total_ms = (time.perf_counter() - t0) * 1000
+    logger.info("启动阶段耗时: %s，总计 %.0f ms（串行合计 %.0f ms）",
+                ", ".join(f"{k}={v:.0f}ms" for k, v in res.timings.items()),
+                res.total_ms, sum(res.timings.values()))
+    return res
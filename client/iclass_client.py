@@ -1,23 +1,156 @@
 # auto_sign_backend/client/iclass_client.py
 import json
 import logging
-from typing import Dict, Any
+import time
+import threading
+from datetime import datetime
+from urllib.parse import urlsplit
+from typing import Dict, Any, Callable, Optional, Tuple
 import requests
 
-from auto_sign_backend.utils.http_retry import request_with_retries
+from auto_sign_backend.utils.http_retry import request_with_retries, RetryPolicy, TimingAdapter
+from auto_sign_backend.store.session_store import SessionStore
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
 
 logger = logging.getLogger(__name__)
 
+# 服务端提示登录态失效时 ERRMSG 中常见的字样
+AUTH_FAILURE_HINTS = ("登录", "session", "过期", "未授权", "重新登")
+
+
+def is_auth_failure(status_code: Optional[int], js: Any = None) -> bool:
+    """判断一次响应是否属于登录态失效（HTTP 401/403，或 JSON 中提示需要重新登录）"""
+    if status_code in (401, 403):
+        return True
+    if isinstance(js, dict) and js.get("STATUS") not in (None, "0"):
+        msg = str(js.get("ERRMSG", "")).lower()
+        return any(h in msg for h in AUTH_FAILURE_HINTS)
+    return False
+
+
+def is_sign_success(resp: Any) -> bool:
+    """send_sign 的返回是否表示服务端已接受签到（请求异常 / 非 JSON / STATUS != 0 都算失败）"""
+    return isinstance(resp, dict) and str(resp.get("STATUS")) == "0"
+
+
+def signed_course_ids(resp: Any) -> set:
+    """
+    从 get_stu_sign_time 的响应里取出服务端已记录签到的 courseSchedId。
+    条目带 stuSignStatus/signStatus 时只认 "1"，不带状态字段的条目视为已签
+    """
+    rows = resp.get("result") if isinstance(resp, dict) else None
+    if not isinstance(rows, list):
+        return set()
+    out = set()
+    for r in rows:
+        if not isinstance(r, dict):
+            continue
+        sid = r.get("courseSchedId") or r.get("id")
+        status = r.get("stuSignStatus", r.get("signStatus", "1"))
+        if sid is not None and str(status) == "1":
+            out.add(str(sid))
+    return out
+
+
+def _status_from_exc(e: BaseException) -> Optional[int]:
+    # request_with_retries 抛出的 RuntimeError 会链上最后一次 HTTPError
+    while e is not None:
+        resp = getattr(e, "response", None)
+        if resp is not None:
+            return resp.status_code
+        e = e.__cause__
+    return None
+
 class IClassClient:
-    def __init__(self, base_url: str, ve_base_url: str, verify_ssl: bool = True, timeout: int = 10):
+    def __init__(self, base_url: str, ve_base_url: str, verify_ssl: bool = True, timeout: int = 10,
+                 session_store: Optional[SessionStore] = None, retry_policy: Optional[RetryPolicy] = None,
+                 clock: Clock = REAL_CLOCK, socket_info_ttl: float = 600):
         self.base_url = base_url.rstrip("/")
         self.ve_base_url = ve_base_url.rstrip("/")
         self.session = requests.Session()
+        # 带建连计时的连接池，指标里才有 connect_ms
+        self.session.mount("http://", TimingAdapter())
+        self.session.mount("https://", TimingAdapter())
         self.session.headers.update({"User-Agent": "student_5.0.1.2_android_9_20__110000"})
         self.verify_ssl = verify_ssl
         self.timeout = timeout
         self.session_id = None
         self.user_id = None
+        self.session_store = session_store
+        self.retry_policy = retry_policy
+        self.clock = clock
+        self.last_sign_reused = None
+        self._phone = None
+        self._password = None
+        self._relogin_lock = threading.Lock()
+        # get_socket_info 的 TTL 缓存：(写入时刻, 响应)；同一教室的连堂课不再重复查询
+        self.socket_info_ttl = socket_info_ttl
+        self._socket_info: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._socket_info_lock = threading.Lock()
+
+    def _apply_session(self, session_id: Optional[str], user_id: Any) -> None:
+        self.session_id = session_id
+        self.user_id = user_id
+        if session_id:
+            # 有些接口需要 sessionId 放在 headers 或 Cookie
+            self.session.headers.update({"sessionId": session_id})
+            self.session.headers.update({"Cookie": f"JSESSIONID={session_id}"})
+
+    def restore_session(self, phone: str) -> bool:
+        """从磁盘缓存恢复登录态；不发请求，有效性留到第一次真实调用时再验证"""
+        if not self.session_store:
+            return False
+        entry = self.session_store.load(phone, self.base_url)
+        if not entry:
+            return False
+        self._phone = phone
+        self._apply_session(entry["session_id"], entry.get("user_id"))
+        logger.info("复用缓存的登录态: sessionId=%s, userId=%s", self.session_id, self.user_id)
+        return True
+
+    def ensure_login(self, phone: str, password: str) -> Dict[str, Any]:
+        """优先复用内存中 / 磁盘缓存的会话，都没有时才真正登录"""
+        self._phone, self._password = phone, password
+        if self.session_id or self.restore_session(phone):
+            return {"STATUS": "0", "result": {"sessionId": self.session_id, "id": self.user_id}, "_cached": True}
+        return self.login(phone, password)
+
+    def _relogin(self, stale_session_id: Optional[str]) -> None:
+        with self._relogin_lock:
+            if self.session_id != stale_session_id:
+                # 并发请求中已有别的线程重新登录过
+                return
+            if self.session_store and self._phone:
+                self.session_store.invalidate(self._phone, self.base_url)
+            if not self._password:
+                raise RuntimeError("登录态已失效，且没有可用于重新登录的密码")
+            logger.info("登录态失效，重新登录")
+            self.login(self._phone, self._password)
+
+    def _get_json(self, name: str, make_url: Callable[[], str]) -> Dict[str, Any]:
+        """
+        GET 并解析 JSON；遇到登录态失效时重新登录一次再重试。
+        make_url 每次重新拼接，保证重新登录后用上新的 user_id
+        """
+        for attempt in (1, 2):
+            sid = self.session_id
+            try:
+                resp = request_with_retries(self.session, "GET", make_url(), timeout=self.timeout, verify=self.verify_ssl,
+                                            policy=self.retry_policy, endpoint=name)
+            except Exception as e:
+                if attempt == 1 and self._phone and is_auth_failure(_status_from_exc(e)):
+                    self._relogin(sid)
+                    continue
+                raise
+            try:
+                js = resp.json()
+            except Exception:
+                logger.warning("%s 返回非 JSON，文本前500字符：%s", name, resp.text[:500])
+                raise
+            if attempt == 1 and self._phone and is_auth_failure(resp.status_code, js):
+                self._relogin(sid)
+                continue
+            return js
 
     def login(self, phone: str, password: str) -> Dict[str, Any]:
         url = f"{self.base_url}/app/user/login.action"
@@ -29,7 +162,8 @@ class IClassClient:
             "userLevel": "1"
         }
         # 这里保留 verify=self.verify_ssl，若你在 dev 环境 SSL 问题可把 verify=False
-        resp = request_with_retries(self.session, "POST", url, data=data, timeout=self.timeout, verify=self.verify_ssl)
+        resp = request_with_retries(self.session, "POST", url, data=data, timeout=self.timeout, verify=self.verify_ssl,
+                                    policy=self.retry_policy, endpoint="login")
         # 尝试解析 json；若失败记录文本以便调试
         try:
             js = resp.json()
@@ -41,36 +175,26 @@ class IClassClient:
             logger.error("登录返回 STATUS != 0: %s", js)
             raise RuntimeError("登录失败: " + str(js))
         res = js["result"]
-        self.session_id = res.get("sessionId")
-        self.user_id = res.get("id")
-        if self.session_id:
-            # 有些接口需要 sessionId 放在 headers 或 Cookie
-            self.session.headers.update({"sessionId": self.session_id})
-            self.session.headers.update({"Cookie": f"JSESSIONID={self.session_id}"})
+        self._phone, self._password = phone, password
+        self._apply_session(res.get("sessionId"), res.get("id"))
+        if self.session_store and self.session_id:
+            try:
+                self.session_store.save(phone, self.base_url, self.session_id, self.user_id)
+            except Exception as e:
+                logger.warning("写入会话缓存失败: %s", e)
         logger.info("登录成功: sessionId=%s, userId=%s", self.session_id, self.user_id)
         return js
 
     def get_course_sched(self, date_str: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/app/course/get_stu_course_sched.action?id={self.user_id}&dateStr={date_str}"
-        resp = request_with_retries(self.session, "GET", url, timeout=self.timeout, verify=self.verify_ssl)
-        try:
-            return resp.json()
-        except Exception:
-            logger.warning("get_course_sched 返回非 JSON，文本前500字符：%s", resp.text[:500])
-            raise
+        return self._get_json("get_course_sched", lambda: f"{self.base_url}/app/course/get_stu_course_sched.action?id={self.user_id}&dateStr={date_str}")
 
     def get_stu_sign_time(self, date_str: str) -> Dict[str, Any]:
-        url = f"{self.base_url}/app/common/get_stu_sign_time.action?id={self.user_id}&dateStr={date_str}"
-        resp = request_with_retries(self.session, "GET", url, timeout=self.timeout, verify=self.verify_ssl)
-        try:
-            return resp.json()
-        except Exception:
-            logger.warning("get_stu_sign_time 返回非 JSON，文本前500字符：%s", resp.text[:500])
-            raise
+        return self._get_json("get_stu_sign_time", lambda: f"{self.base_url}/app/common/get_stu_sign_time.action?id={self.user_id}&dateStr={date_str}")
 
     def get_qxkt_sign_time(self) -> Dict[str, Any]:
         url = f"{self.ve_base_url}/ve/webservices/app_qxkt.shtml?method=getQxktSignTime"
-        resp = request_with_retries(self.session, "GET", url, timeout=self.timeout, verify=False)
+        resp = request_with_retries(self.session, "GET", url, timeout=self.timeout, verify=False,
+                                    policy=self.retry_policy, endpoint="get_qxkt_sign_time")
         try:
             return resp.json()
         except Exception:
@@ -80,20 +204,69 @@ class IClassClient:
                 logger.warning("get_qxkt_sign_time 解析失败，返回空 result")
                 return {"result": []}
 
-    def get_socket_info(self) -> Dict[str, Any]:
-        url = f"{self.base_url}/app/service/get_socket_info.action?id={self.user_id}"
-        resp = request_with_retries(self.session, "GET", url, timeout=self.timeout, verify=self.verify_ssl)
+    def get_socket_info(self, refresh: bool = False) -> Dict[str, Any]:
+        """带 TTL 缓存；并发调用只发一次请求，其余线程等着用同一份结果"""
+        if not refresh:
+            cached = self.cached_socket_info()
+            if cached is not None:
+                return cached
+        with self._socket_info_lock:
+            if not refresh:
+                cached = self.cached_socket_info()
+                if cached is not None:
+                    return cached
+            js = self._get_json("get_socket_info", lambda: f"{self.base_url}/app/service/get_socket_info.action?id={self.user_id}")
+            self._socket_info = (self.clock.time(), js)
+            return js
+
+    def cached_socket_info(self) -> Optional[Dict[str, Any]]:
+        """只读缓存，不发请求；没有或已过期返回 None"""
+        entry = self._socket_info
+        if entry is None or self.clock.time() - entry[0] > self.socket_info_ttl:
+            return None
+        return entry[1]
+
+    def _new_conn_count(self, url: str) -> int:
+        """该主机上连接池累计新建的连接数；请求前后不变说明复用了已有连接"""
+        host = urlsplit(url).hostname
         try:
-            return resp.json()
+            pools = self.session.get_adapter(url).poolmanager.pools
+            return sum(getattr(pools.get(k), "num_connections", 0)
+                       for k in list(pools.keys()) if getattr(k, "key_host", None) == host)
         except Exception:
-            logger.warning("get_socket_info 返回非 JSON，文本前500字符：%s", resp.text[:500])
-            raise
+            return 0
+
+    def prewarm(self, url: str, timeout: Optional[float] = None,
+                on_date: Optional[Callable[[Optional[str], float], Any]] = None) -> bool:
+        """
+        预热到 url 所在主机的连接：对站点根路径发一个 HEAD，让 DNS/TCP/TLS 提前完成，
+        连接留在 session 的连接池里给随后的签到请求复用。失败只记日志，不影响签到。
+        on_date(Date 头, 耗时秒数) 用于把这次响应交给服务器时钟估计
+        """
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}/"
+        t0 = time.perf_counter()
+        before = self._new_conn_count(url)
+        try:
+            resp = self.session.request("HEAD", origin, timeout=timeout or self.timeout,
+                                        verify=self.verify_ssl, allow_redirects=False)
+        except Exception as e:
+            logger.warning("预热连接失败 %s: %s", origin, e)
+            return False
+        if on_date is not None:
+            on_date(resp.headers.get("Date"), time.perf_counter() - t0)
+        logger.info("预热连接 %s 完成，耗时 %.0f ms，新建连接 %d 个",
+                    origin, (time.perf_counter() - t0) * 1000, self._new_conn_count(url) - before)
+        return True
 
-    def send_sign(self, sign_url: str, payload: dict) -> Dict[str, Any]:
+    def send_sign(self, sign_url: str, payload: dict, deadline: Optional[datetime] = None,
+                  _retry_auth: bool = True) -> Dict[str, Any]:
         """
         修正版签到请求：强制使用表单提交 + 携带 sessionId/Cookie
+        登录态失效时重新登录并重发一次；deadline 一般取课程的 sign_end，重试不会越过它
         """
-        logger.info("发送签到请求到 %s", sign_url)
+        sched_id = payload.get("courseSchedId")
+        logger.info("发送签到请求到 %s", sign_url, extra={"event": "sign_request", "courseSchedId": sched_id})
         headers = {
             "User-Agent": "student_5.0.1.2_android_9_20__110000",
             "Content-Type": "application/x-www-form-urlencoded",
@@ -101,10 +274,12 @@ class IClassClient:
         }
 
         # 关键：手动加上 Cookie/SessionId
+        sid = self.session_id
         if self.session_id:
             headers["sessionId"] = self.session_id
             headers["Cookie"] = f"JSESSIONID={self.session_id}"
 
+        conns_before = self._new_conn_count(sign_url)
         try:
             resp = request_with_retries(
                 self.session,
@@ -113,19 +288,33 @@ class IClassClient:
                 data=payload,
                 headers=headers,
                 timeout=self.timeout,
-                verify=self.verify_ssl
+                verify=self.verify_ssl,
+                policy=self.retry_policy,
+                deadline=deadline,
+                endpoint="stu_auto_sign",
+                clock=self.clock
             )
         except Exception as e:
+            if _retry_auth and self._phone and is_auth_failure(_status_from_exc(e)):
+                self._relogin(sid)
+                return self.send_sign(sign_url, payload, deadline, _retry_auth=False)
             logger.error("签到请求异常: %s", e)
             return {"error": str(e)}
 
-        logger.info("签到响应 HTTP %s", resp.status_code)
+        self.last_sign_reused = self._new_conn_count(sign_url) == conns_before
+        latency_ms = resp.elapsed.total_seconds() * 1000
+        logger.info("签到响应 HTTP %s（%s连接，耗时 %.0f ms）", resp.status_code,
+                    "复用" if self.last_sign_reused else "新建", latency_ms,
+                    extra={"event": "sign_response", "courseSchedId": sched_id, "latency_ms": round(latency_ms, 1)})
         snippet = resp.text[:500]
 
         try:
             js = resp.json()
-            logger.info("签到返回 JSON: %s", js)
-            return js
         except Exception:
             logger.warning("签到接口返回非 JSON，原始内容前500字符：%s", snippet)
             return {"_raw_text": snippet, "_status_code": resp.status_code}
+
+        if _retry_auth and self._phone and is_auth_failure(resp.status_code, js):
+            self._relogin(sid)
+            return self.send_sign(sign_url, payload, deadline, _retry_auth=False)
+        return js
@@ -1,6 +1,11 @@
 # auto_sign_backend/config.py
 
 import os
+import json
+import logging
+from typing import Any, Dict, Iterable, Mapping, Optional
+
+logger = logging.getLogger("auto_sign")
 
 class Config:
     USERNAME = os.getenv("ICLASS_USERNAME")
@@ -17,3 +22,157 @@ class Config:
     PUSH_KEY = os.getenv("PUSH_KEY")
 
 config = Config()
+
+# ====================== 配置 ======================
+DEFAULT_CONFIG = {
+    "base_url": "https://iclass.buaa.edu.cn:8181",
+    "ve_base_url": "http://iclass.buaa.edu.cn:88",
+    "phone": os.getenv("ICLASS_PHONE", "25375093"),
+    "password_env_var": "SIGN_PASS",
+    "password": None,
+    "sign_url": "https://iclass.buaa.edu.cn:8181/app/course/stu_auto_sign.action",
+    "dry_run": False,
+    "verify_ssl": False,
+    "timeout_sec": 10,
+    "max_retries": 3,
+    "retry_backoff": 0.5,          # 指数退避的起始秒数
+    "retry_max_backoff": 8.0,
+    "sign_retry_budget_sec": 20,   # 签到请求（含重试）的总预算，且不超过 sign_end
+    "sign_workers": 4,             # 并行准备 / 发送签到的线程数（连堂课、晚启动时多个窗口同时打开），0 表示在调度线程里直接签到
+    "sign_pacing_sec": 3,          # 两次签到请求之间的最小间隔（防风控），0 表示不限
+    "prewarm_lead_sec": 5,         # 窗口打开前多少秒预取 socket_info、预热到签到主机的连接，0 表示不预热
+    "socket_info_ttl_sec": 600,    # get_socket_info 结果的缓存时间
+    "server_clock": True,          # 用响应的 Date 头估计服务器时钟偏差，按服务器时间触发签到窗口
+    "server_clock_window": 16,     # 参与估计的最近样本数
+    "server_clock_probes": 3,      # 预热时对准秒边界发几次 HEAD 来收紧偏差估计，0 表示只用已有响应
+    "before_minute_default": 5,
+    "after_minute_default": 30,
+    "fake_longitude": 116.397451,
+    "fake_latitude": 39.909187,
+    "manual_mac": "A0:EE:1A:E0:A2:0E",
+    "log_file": "auto_sign.log",
+    "log_json": False,             # True 时日志文件为 JSON 行（event/courseSchedId/latency_ms 字段）
+    "log_max_bytes": 5 * 1024 * 1024,
+    "log_backup_count": 5,
+    "session_cache_file": ".iclass_session.json",   # 为空则每次启动都重新登录
+    "session_ttl_sec": 12 * 3600,
+    "schedule_db": "schedule_cache.db",              # 为空则不使用本地课程表缓存
+    "prefetch_days": 7,
+    "plan_days": 120,              # --plan 时加载的天数（约一学期）
+    "schedule_refresh_min_sec": 120,     # 签到窗口前后重新拉取今日课程表的间隔
+    "schedule_refresh_max_sec": 1800,    # 空闲时的最长刷新间隔，0 表示不刷新
+    "schedule_refresh_near_sec": 900,    # 距窗口打开多少秒以内按最短间隔刷新
+    "verify_delay_sec": 3,         # 签到后多久用 get_stu_sign_time 核对，0 表示不核对
+    "verify_max_delay_sec": 60,    # 核对间隔指数增长的上限
+    "verify_max_resends": 2,       # 核对不到时每门课最多重签次数
+    "metrics_prom_file": None,     # 退出时写 Prometheus textfile，如 /var/lib/node_exporter/auto_sign.prom
+    "metrics_json_file": None,     # 退出时写 JSON 摘要
+    "journal_file": "sign_journal.jsonl",   # 签到日志，重启后据此跳过已签课程；为空则不记录
+    "journal_keep_days": 7,
+    "daemon_rollover": "00:05",    # 常驻模式每天重建签到窗口的时刻
+    "daemon_retry_sec": 300,       # 常驻模式登录/取课表失败后的重试间隔
+    "push_key": None,              # 为空时取 config.py 的 PUSH_KEY（环境变量 PUSH_KEY）
+    "notify_sender": None,         # webhook / file / stdout；为空时有 push_key 就用 webhook，否则不通知
+    "notify_webhook_url": "https://sctapi.ftqq.com/{key}.send",   # {key} 替换为 push_key（Server 酱）
+    "notify_file": "notifications.jsonl",
+    "notify_batch_sec": 2,         # 攒多少秒的通知合成一条推送
+    "notify_dedupe_sec": 3600,     # 同一事件多久内不重复推送
+    "notify_queue_size": 100,
+    "status_port": None,           # 状态服务端口（/healthz /status /metrics），为空或 0 表示不开
+    "status_host": "127.0.0.1",
+    "profile_dir": "profiles",     # --profile / --trace-malloc 时每个阶段的剖析文件写到这里
+    "profile_top": 10,             # 日志里打印的 top N 条
+}
+
+ENV_PREFIX = "AUTO_SIGN_"            # 环境变量 AUTO_SIGN_<KEY> 覆盖同名配置，如 AUTO_SIGN_DRY_RUN=1
+CONFIG_FILE_ENV = "AUTO_SIGN_CONFIG"  # 配置文件（JSON）路径
+
+_TRUE = {"1", "true", "yes", "on"}
+_FALSE = {"0", "false", "no", "off", ""}
+
+def _bool(raw: str) -> bool:
+    low = raw.strip().lower()
+    if low not in _TRUE and low not in _FALSE:
+        raise ValueError(raw)
+    return low in _TRUE
+
+# 环境变量 / 命令行字符串的转换方式；没列出的（账号、密码、push_key、URL、文件路径等）一律按原样当字符串，
+# 不做 JSON 猜测，避免 AUTO_SIGN_PASSWORD=123456 变成整数
+CONFIG_TYPES = {
+    **dict.fromkeys(("dry_run", "verify_ssl", "server_clock", "log_json"), _bool),
+    **dict.fromkeys(("max_retries", "sign_workers", "server_clock_window", "server_clock_probes",
+                     "before_minute_default", "after_minute_default", "log_max_bytes", "log_backup_count",
+                     "prefetch_days", "plan_days", "verify_max_resends", "journal_keep_days",
+                     "notify_queue_size", "status_port", "profile_top"), int),
+    **dict.fromkeys(("fake_longitude", "fake_latitude", "retry_backoff", "retry_max_backoff"), float),
+    **{k: float for k in DEFAULT_CONFIG if k.endswith("_sec")},
+}
+
+def _coerce(key: str, raw: str) -> Any:
+    """按 CONFIG_TYPES 转换；数值 / 布尔以外的项给空串表示"不设置"（如 AUTO_SIGN_STATUS_PORT=）"""
+    conv = CONFIG_TYPES.get(key, str)
+    if conv is str:
+        return raw
+    if conv is not _bool and not raw.strip():
+        return None
+    try:
+        return conv(raw.strip())
+    except ValueError:
+        raise ValueError(f"配置 {key} 需要 {'布尔值' if conv is _bool else conv.__name__}: {raw!r}") from None
+
+def _config_py() -> Dict[str, Any]:
+    """config.py 里 Config 的取值（来自 ICLASS_USERNAME 等旧环境变量），只取设置了的"""
+    out = {"phone": Config.USERNAME, "password": Config.PASSWORD, "push_key": Config.PUSH_KEY,
+           "fake_latitude": Config.LATITUDE and float(Config.LATITUDE),
+           "fake_longitude": Config.LONGITUDE and float(Config.LONGITUDE)}
+    return {k: v for k, v in out.items() if v}
+
+def _from_file(path: str) -> Dict[str, Any]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"配置文件 {path} 顶层应为 JSON 对象")
+    return data
+
+def _from_env(env: Mapping[str, str]) -> Dict[str, Any]:
+    out = {}
+    for key in DEFAULT_CONFIG:
+        raw = env.get(ENV_PREFIX + key.upper())
+        if raw is not None:
+            out[key] = _coerce(key, raw)
+    return out
+
+def parse_overrides(items: Iterable[str]) -> Dict[str, Any]:
+    """命令行的 KEY=VALUE 列表"""
+    out = {}
+    for item in items:
+        key, sep, raw = item.partition("=")
+        if not sep:
+            raise ValueError(f"配置覆盖应为 KEY=VALUE: {item!r}")
+        out[key.strip()] = _coerce(key.strip(), raw)
+    return out
+
+def load_config(path: Optional[str] = None, overrides: Optional[Mapping[str, Any]] = None,
+                env: Optional[Mapping[str, str]] = None, require_password: bool = True) -> Dict[str, Any]:
+    """
+    合并配置，后者覆盖前者：DEFAULT_CONFIG → config.py（Config）→ 配置文件（path 或 $AUTO_SIGN_CONFIG）
+    → 环境变量 AUTO_SIGN_<KEY> → overrides（命令行）。密码最后还会从 password_env_var 指定的环境变量取
+    """
+    env = os.environ if env is None else env
+    cfg = DEFAULT_CONFIG.copy()
+    cfg.update(_config_py())
+    path = path or env.get(CONFIG_FILE_ENV)
+    layers = [_from_file(path)] if path else []
+    layers += [_from_env(env), dict(overrides or {})]
+    for layer in layers:
+        unknown = sorted(set(layer) - set(DEFAULT_CONFIG))
+        if unknown:
+            logger.warning("忽略未知的配置项: %s", ", ".join(unknown))
+        cfg.update({k: v for k, v in layer.items() if k in DEFAULT_CONFIG})
+
+    cfg["password"] = cfg["password"] or env.get(cfg["password_env_var"])
+    if not cfg.get("ve_base_url"):
+        cfg["ve_base_url"] = cfg["base_url"].replace(":8181", ":88") if ":8181" in cfg["base_url"] else cfg["base_url"]
+    if require_password and not cfg["password"]:
+        logger.warning("未找到密码，请检查环境变量 SIGN_PASS")
+    return cfg
@@ -0,0 +1,71 @@
+# auto_sign_backend/logic/course.py
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from auto_sign_backend.utils.coords import parse_coord
+from auto_sign_backend.utils.time_utils import parse_time
+
+
+@dataclass(slots=True)
+class Course:
+    """
+    一节课：课程表响应只解析一次，时间、经纬度、签到窗口都在这里预先算好，
+    调度和签到阶段不再碰原始 dict
+    """
+    sched_id: str
+    name: str
+    classroom: str
+    begin: datetime
+    end: datetime
+    longitude: float
+    latitude: float
+    sign_begin: datetime
+    sign_end: datetime
+
+    @classmethod
+    def from_api(cls, d: Dict[str, Any], before_min: int, after_min: int,
+                 default_lon: Optional[float] = None, default_lat: Optional[float] = None) -> Optional["Course"]:
+        """由 get_course_sched 的一条 result 构造；缺少或无法解析上下课时间时返回 None"""
+        b, e = d.get("classBeginTime"), d.get("classEndTime")
+        if not b or not e:
+            return None
+        try:
+            begin, end = parse_time(b), parse_time(e)
+        except Exception:
+            return None
+        return cls(
+            sched_id=str(d.get("courseSchedId") or d.get("id")),
+            name=d.get("courseName") or "未知",
+            classroom=d.get("classroomName") or "未知",
+            begin=begin,
+            end=end,
+            longitude=parse_coord(d.get("classroomLongitude"), default_lon),
+            latitude=parse_coord(d.get("classroomLatitude"), default_lat),
+            sign_begin=begin - timedelta(minutes=before_min),
+            sign_end=end + timedelta(minutes=after_min),
+        )
+
+    def is_open(self, now: datetime) -> bool:
+        return self.sign_begin <= now <= self.sign_end
+
+
+def sched_ok(sched: Any) -> bool:
+    """get_course_sched 的响应是否可用：STATUS 为 "0" 且 result 是列表；服务端报错（系统繁忙 / 维护）时为 False"""
+    return isinstance(sched, dict) and str(sched.get("STATUS")) == "0" and isinstance(sched.get("result"), list)
+
+
+def parse_courses(sched: Any, before_min: int, after_min: int,
+                  default_lon: Optional[float] = None, default_lat: Optional[float] = None) -> List[Course]:
+    """一遍扫描课程表响应，得到按 sign_begin 排序的 Course 列表（无效条目直接丢弃）"""
+    rows = sched.get("result", []) if isinstance(sched, dict) else []
+    if not isinstance(rows, list):
+        return []
+    out = []
+    for d in rows:
+        if isinstance(d, dict):
+            c = Course.from_api(d, before_min, after_min, default_lon, default_lat)
+            if c is not None:
+                out.append(c)
+    out.sort(key=lambda c: c.sign_begin)
+    return out
@@ -0,0 +1,131 @@
+# auto_sign_backend/logic/event_scheduler.py
+import heapq
+import itertools
+import threading
+from datetime import datetime
+from typing import Any, Callable, List, Optional
+
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+
+
+class ScheduledEvent:
+    """
+    调度器中的一条事件：when 到期后交给 handler 处理
+    kind 如 "sign_begin"/"sign_end"，key 一般是 courseSchedId，便于按课程撤销
+    """
+    __slots__ = ("when", "seq", "kind", "key", "payload", "cancelled")
+
+    def __init__(self, when: datetime, seq: int, kind: str, key: Any = None, payload: Any = None):
+        self.when = when
+        self.seq = seq
+        self.kind = kind
+        self.key = key
+        self.payload = payload
+        self.cancelled = False
+
+    def __lt__(self, other: "ScheduledEvent") -> bool:
+        return (self.when, self.seq) < (other.when, other.seq)
+
+    def __repr__(self) -> str:
+        return f"ScheduledEvent({self.kind}, key={self.key!r}, when={self.when:%Y-%m-%d %H:%M:%S})"
+
+
+class EventScheduler:
+    """
+    按截止时间驱动的调度器：最小堆保存事件，精确睡到下一个事件到期。
+    线程安全：运行期间可以从其他线程 schedule/cancel/stop，会立即唤醒等待。
+    时间取自 clock，传入 SimulatedClock 时会直接跳到下一个事件。
+    """
+
+    def __init__(self, clock: Clock = REAL_CLOCK):
+        self.clock = clock
+        self._heap: List[ScheduledEvent] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._stopped = False
+
+    def schedule(self, when: datetime, kind: str, key: Any = None, payload: Any = None) -> ScheduledEvent:
+        with self._cond:
+            ev = ScheduledEvent(when, next(self._seq), kind, key, payload)
+            heapq.heappush(self._heap, ev)
+            # 新事件可能比当前等待的更早，唤醒 run 重新计算睡眠时长
+            self._cond.notify_all()
+            return ev
+
+    def cancel(self, event: ScheduledEvent) -> None:
+        # 惰性删除：只打标记，出堆时丢弃
+        with self._cond:
+            event.cancelled = True
+            self._cond.notify_all()
+
+    def cancel_key(self, key: Any, kind: Optional[str] = None) -> int:
+        """撤销某个 key 下的全部事件（可按 kind 过滤），返回撤销数量"""
+        n = 0
+        with self._cond:
+            for ev in self._heap:
+                if not ev.cancelled and ev.key == key and (kind is None or ev.kind == kind):
+                    ev.cancelled = True
+                    n += 1
+            if n:
+                self._cond.notify_all()
+        return n
+
+    def wake(self) -> None:
+        """时钟被校正（如服务器时钟偏差更新）后调用，让 run 按新的时间重新计算睡眠时长"""
+        with self._cond:
+            self._cond.notify_all()
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+
+    @property
+    def stopped(self) -> bool:
+        return self._stopped
+
+    def pending(self) -> List[ScheduledEvent]:
+        """按时间顺序返回尚未触发的事件快照"""
+        with self._cond:
+            return sorted(ev for ev in self._heap if not ev.cancelled)
+
+    def next_event(self) -> Optional[ScheduledEvent]:
+        with self._cond:
+            self._drop_cancelled()
+            return self._heap[0] if self._heap else None
+
+    def __len__(self) -> int:
+        with self._cond:
+            return sum(1 for ev in self._heap if not ev.cancelled)
+
+    def _drop_cancelled(self) -> None:
+        while self._heap and self._heap[0].cancelled:
+            heapq.heappop(self._heap)
+
+    def _next_due(self, keep_alive: bool) -> Optional[ScheduledEvent]:
+        # 阻塞直到有事件到期；返回 None 表示已停止或（非常驻模式下）没有事件了
+        with self._cond:
+            while not self._stopped:
+                self._drop_cancelled()
+                if not self._heap:
+                    if not keep_alive:
+                        return None
+                    self.clock.wait(self._cond)
+                    continue
+                delay = (self._heap[0].when - self.clock.now()).total_seconds()
+                if delay > 0:
+                    self.clock.wait(self._cond, delay)
+                    continue
+                return heapq.heappop(self._heap)
+            return None
+
+    def run(self, handler: Callable[[ScheduledEvent], None], keep_alive: bool = False) -> None:
+        """
+        事件循环：到期事件依次交给 handler（在锁外调用，handler 内可以继续 schedule）
+        keep_alive=False 时堆空即返回；True 时一直等待直到 stop()
+        """
+        while True:
+            ev = self._next_due(keep_alive)
+            if ev is None:
+                return
+            handler(ev)
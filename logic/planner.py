@@ -0,0 +1,151 @@
+# auto_sign_backend/logic/planner.py
+import bisect
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from auto_sign_backend.logic.course import Course, parse_courses
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+
+_ICS_TIME = "%Y%m%dT%H%M%S"
+
+
+class Planner:
+    """
+    整学期签到窗口的区间索引：课程按 sign_begin 排序，另存 sign_end 的前缀最大值，再按 sign_end 排一份。
+    - pending / ended 是按 sign_end 排序那份的一段后缀 / 前缀：O(log n + k)
+    - next_to_open 两次二分：O(log n + k)
+    - overlapping / active 先用两次二分圈出候选段再逐个过滤：O(log n + m)，m 是候选段长度。
+      平常的课表窗口短、互不包含，m ≈ k；但只要前面有一个特别长的窗口把前缀最大值撑大，m 就会接近 n
+    """
+
+    def __init__(self, courses: Iterable[Course]):
+        self.courses: List[Course] = sorted(courses, key=lambda c: (c.sign_begin, c.sign_end))
+        self._begins = [c.sign_begin for c in self.courses]
+        self._max_end = []
+        m = None
+        for c in self.courses:
+            m = c.sign_end if m is None or c.sign_end > m else m
+            self._max_end.append(m)
+        self._by_end: List[Course] = sorted(self.courses, key=lambda c: (c.sign_end, c.sign_begin))
+        self._ends = [c.sign_end for c in self._by_end]
+        self._by_id: Dict[str, Course] = {c.sched_id: c for c in self.courses}
+
+    def __len__(self) -> int:
+        return len(self.courses)
+
+    def __iter__(self):
+        return iter(self.courses)
+
+    def get(self, sched_id: str) -> Optional[Course]:
+        return self._by_id.get(str(sched_id))
+
+    def overlapping(self, begin: datetime, end: datetime) -> List[Course]:
+        """签到窗口与 [begin, end] 有交集的课程，按 sign_begin 排序"""
+        lo = bisect.bisect_left(self._max_end, begin)
+        hi = bisect.bisect_right(self._begins, end)
+        return [c for c in self.courses[lo:hi] if c.sign_end >= begin]
+
+    def active(self, now: datetime) -> List[Course]:
+        """now 时刻签到窗口开着的课程"""
+        return self.overlapping(now, now)
+
+    def next_to_open(self, now: datetime) -> List[Course]:
+        """now 之后最早打开的窗口（同一时刻打开的连堂课一起返回），没有则为空"""
+        i = bisect.bisect_right(self._begins, now)
+        if i == len(self.courses):
+            return []
+        j = bisect.bisect_right(self._begins, self._begins[i])
+        return self.courses[i:j]
+
+    def pending(self, now: datetime) -> List[Course]:
+        """窗口尚未结束的课程（已打开或还没打开），按 sign_begin 排序"""
+        lo = bisect.bisect_left(self._ends, now)
+        return sorted(self._by_end[lo:], key=lambda c: (c.sign_begin, c.sign_end))
+
+    def ended(self, now: datetime) -> List[Course]:
+        """窗口在 now 之前已经结束的课程，按 sign_begin 排序"""
+        hi = bisect.bisect_left(self._ends, now)
+        return sorted(self._by_end[:hi], key=lambda c: (c.sign_begin, c.sign_end))
+
+    def day(self, date_str: str) -> List[Course]:
+        """某天（YYYYMMDD）上课的课程"""
+        d = datetime.strptime(date_str, "%Y%m%d")
+        return [c for c in self.overlapping(d, d + timedelta(days=1)) if c.begin.date() == d.date()]
+
+    def conflicts(self) -> List[List[Course]]:
+        """签到窗口相互重叠的课程组（连堂课），一遍扫描"""
+        groups, cur, cur_end = [], [], None
+        for c in self.courses:
+            if cur and c.sign_begin <= cur_end:
+                cur.append(c)
+                cur_end = max(cur_end, c.sign_end)
+            else:
+                if len(cur) > 1:
+                    groups.append(cur)
+                cur, cur_end = [c], c.sign_end
+        if len(cur) > 1:
+            groups.append(cur)
+        return groups
+
+    def status(self, now: datetime) -> Dict[str, object]:
+        """给状态展示用的摘要"""
+        def brief(c: Course) -> Dict[str, str]:
+            return {"id": c.sched_id, "name": c.name, "classroom": c.classroom,
+                    "sign_begin": c.sign_begin.strftime("%Y-%m-%d %H:%M:%S"),
+                    "sign_end": c.sign_end.strftime("%Y-%m-%d %H:%M:%S")}
+        return {
+            "now": now.strftime("%Y-%m-%d %H:%M:%S"),
+            "total": len(self.courses),
+            "active": [brief(c) for c in self.active(now)],
+            "next": [brief(c) for c in self.next_to_open(now)],
+            "pending": len(self.pending(now)),
+        }
+
+    def to_ical(self, calname: str = "iClass 签到计划", clock: Clock = REAL_CLOCK) -> str:
+        """导出 iCalendar：每个签到窗口一个 VEVENT（本地时间，不带时区）；DTSTAMP 取 clock 的当前时间"""
+        stamp = clock.now().strftime(_ICS_TIME)
+        lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//auto_sign_backend//planner//CN",
+                 "CALSCALE:GREGORIAN", "X-WR-CALNAME:" + _ics_escape(calname)]
+        for c in self.courses:
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{c.sched_id}-{c.sign_begin.strftime(_ICS_TIME)}@auto_sign_backend",
+                "DTSTAMP:" + stamp,
+                "DTSTART:" + c.sign_begin.strftime(_ICS_TIME),
+                "DTEND:" + c.sign_end.strftime(_ICS_TIME),
+                "SUMMARY:" + _ics_escape(f"签到 {c.name}"),
+                "LOCATION:" + _ics_escape(c.classroom),
+                "DESCRIPTION:" + _ics_escape(f"上课 {c.begin:%H:%M}-{c.end:%H:%M}，courseSchedId={c.sched_id}"),
+                "END:VEVENT",
+            ]
+        lines.append("END:VCALENDAR")
+        return "".join(_ics_fold(l) + "\r\n" for l in lines)
+
+
+def _ics_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_fold(line: str, limit: int = 75) -> str:
+    """RFC 5545 折行：每行不超过 75 字节，续行以空格开头，不在 UTF-8 字符中间断开"""
+    out, cur, size = [], "", 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > limit:
+            out.append(cur)
+            cur, size = " ", 1
+        cur += ch
+        size += n
+    out.append(cur)
+    return "\r\n".join(out)
+
+
+def load_term(store, start: datetime, days: int, before_min: int, after_min: int,
+              default_lon: Optional[float] = None, default_lat: Optional[float] = None) -> Planner:
+    """从本地课程表缓存（ScheduleStore）读出 start 起 days 天的课程，建成 Planner；缺的日期跳过"""
+    courses = []
+    for i in range(days):
+        sched = store.get_day((start + timedelta(days=i)).strftime("%Y%m%d"))
+        if sched is not None:
+            courses.extend(parse_courses(sched, before_min, after_min, default_lon, default_lat))
+    return Planner(courses)
@@ -0,0 +1,106 @@
+# auto_sign_backend/logic/refresher.py
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from auto_sign_backend.logic.course import Course, parse_courses, sched_ok
+from auto_sign_backend.store.schedule_store import content_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CourseDiff(NamedTuple):
+    added: List[Course]
+    removed: List[Course]
+    changed: List[Course]      # 新版本的 Course
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_courses(old: Dict[str, Course], new: Dict[str, Course]) -> CourseDiff:
+    """按 courseSchedId 比较两版课程表（dataclass 逐字段比较）"""
+    added = [c for k, c in new.items() if k not in old]
+    removed = [c for k, c in old.items() if k not in new]
+    changed = [c for k, c in new.items() if k in old and old[k] != c]
+    return CourseDiff(added, removed, changed)
+
+
+class ScheduleRefresher:
+    """
+    当天课程表的增量刷新：重新拉取 get_course_sched，内容哈希不变就什么都不做；
+    变了才逐门课比较，只把受影响的课程交给 on_change 重排窗口。
+    刷新间隔自适应：离下一个签到窗口越近刷新越勤，空闲时很少刷新
+    """
+
+    def __init__(self, client, date_str: str, courses: Iterable[Course], sched: Any,
+                 before_min: int, after_min: int, default_lon: Optional[float] = None,
+                 default_lat: Optional[float] = None, min_interval: float = 60, max_interval: float = 1800,
+                 near_sec: float = 900, store=None):
+        self.client = client
+        self.date_str = date_str
+        self.before_min, self.after_min = before_min, after_min
+        self.default_lon, self.default_lat = default_lon, default_lat
+        self.min_interval, self.max_interval, self.near_sec = min_interval, max_interval, near_sec
+        self.store = store
+        self.courses: Dict[str, Course] = {c.sched_id: c for c in courses}
+        self.hash = content_hash(sched)
+        self._empty_seen = False      # 上一次刷新拿到了空课表，还等一次确认
+        self._lock = threading.Lock()
+
+    def interval(self, now: datetime, done: Iterable[str] = ()) -> float:
+        """下一次刷新前等待的秒数：有窗口开着或即将打开时取 min_interval，否则约为距下一个窗口的一半"""
+        done = set(done)
+        with self._lock:
+            todo = [c for k, c in self.courses.items() if k not in done and c.sign_end >= now]
+        if not todo:
+            return self.max_interval
+        lead = min((c.sign_begin - now).total_seconds() for c in todo)
+        if lead <= self.near_sec:
+            return self.min_interval
+        return max(self.min_interval, min(self.max_interval, lead / 2))
+
+    def check(self) -> CourseDiff:
+        """
+        拉取一次课程表并与当前版本比较；拉取失败或服务端报错时保持原样。
+        新课表为空而当前还有课时先不动，连续两次都为空才当作整天的课都取消了
+        """
+        try:
+            sched = self.client.get_course_sched(self.date_str)
+        except Exception as e:
+            logger.warning("刷新课程表失败，沿用当前课表: %s", e)
+            return CourseDiff([], [], [])
+        if not sched_ok(sched):
+            logger.warning("课程表接口返回错误，沿用当前课表: %s", sched.get("ERRMSG") if isinstance(sched, dict) else sched)
+            return CourseDiff([], [], [])
+        h = content_hash(sched)
+        if h == self.hash:
+            self._empty_seen = False
+            return CourseDiff([], [], [])
+        new = {c.sched_id: c for c in parse_courses(sched, self.before_min, self.after_min,
+                                                    self.default_lon, self.default_lat)}
+        if not new and self.courses and not self._empty_seen:
+            self._empty_seen = True
+            logger.warning("刷新得到空课表，下次刷新确认后再取消全部 %d 门课", len(self.courses))
+            return CourseDiff([], [], [])
+        self._empty_seen = False
+        with self._lock:
+            diff = diff_courses(self.courses, new)
+            self.courses, self.hash = new, h
+        if self.store is not None:
+            self.store.put_day(self.date_str, sched)
+        logger.info("课程表有变化：新增 %d，取消 %d，调整 %d", len(diff.added), len(diff.removed), len(diff.changed))
+        return diff
+
+    def refresh(self, on_change: Callable[[CourseDiff], None]) -> CourseDiff:
+        diff = self.check()
+        if diff:
+            on_change(diff)
+        return diff
+
+    def start(self, on_change: Callable[[CourseDiff], None]) -> threading.Thread:
+        """在后台线程里刷新一次，慢请求不会推迟调度器里的签到事件"""
+        t = threading.Thread(target=self.refresh, args=(on_change,), name="schedule-refresh", daemon=True)
+        t.start()
+        return t
@@ -1,20 +1,249 @@
 # auto_sign_backend/logic/signer.py
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
 
-class Signer:
-    def __init__(self, client):
+from auto_sign_backend.client.iclass_client import is_sign_success
+from auto_sign_backend.logic.course import Course
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+from auto_sign_backend.utils.coords import parse_coord
+from auto_sign_backend.utils.profiling import PhaseProfiler, NO_PROFILER
+from auto_sign_backend.utils.server_clock import ServerTimeClock
+
+logger = logging.getLogger(__name__)
+
+
+class SignStrategy:
+    """一种签到方式：prepare 在窗口打开前做能提前做的事，send 在窗口内发出签到并返回服务端响应"""
+
+    def prepare(self, course: Course) -> Any:
+        return None
+
+    def send(self, course: Course, prepared: Any, now: datetime, deadline: datetime) -> Any:
+        raise NotImplementedError
+
+
+class AutoSignStrategy(SignStrategy):
+    """
+    stu_auto_sign 流程：prepare 取（缓存的）socket_info 拼好表单、预热到签到主机的连接，
+    按服务器时间触发时顺便对准秒边界发几次 HEAD 收紧时钟偏差；send 补上 signTime 后用 send_sign 发出
+    """
+
+    def __init__(self, client, sign_url: str, router_mac: Optional[str] = None,
+                 fallback_socket_info: Optional[Dict[str, Any]] = None, prewarm_timeout: Optional[float] = None,
+                 clock: Clock = REAL_CLOCK, clock_probes: int = 0,
+                 on_clock_update: Optional[Callable[[], None]] = None):
         self.client = client
+        self.sign_url = sign_url
+        self.router_mac = router_mac or "00:db:6e:66:8a:d8"
+        self.fallback_socket_info = fallback_socket_info or {}
+        self.prewarm_timeout = prewarm_timeout
+        self.clock = clock
+        self.clock_probes = clock_probes
+        self.on_clock_update = on_clock_update
+
+    def build_payload(self, course: Course, r: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "id": self.client.user_id,
+            "courseSchedId": course.sched_id,
+            "routerInfo": self.router_mac,
+            "longitude": parse_coord(r.get("classroomLongitude"), course.longitude),
+            "latitude": parse_coord(r.get("classroomLatitude"), course.latitude),
+            "machineInfo": "Android",
+        }
+
+    def socket_info(self) -> Dict[str, Any]:
+        """缓存的 → 实时查询的 → 启动阶段预取的"""
+        r = self.client.cached_socket_info()
+        if r is None:
+            try:
+                r = self.client.get_socket_info()
+            except Exception:
+                r = self.fallback_socket_info
+        return r.get("result", {})
+
+    def prepare(self, course: Course) -> Optional[Dict[str, Any]]:
+        payload = None
+        try:
+            payload = self.build_payload(course, self.client.get_socket_info().get("result", {}))
+        except Exception as e:
+            logger.warning("预取课程 [%s] 的 socket_info 失败，签到时再查: %s", course.name, e)
+        probed = 0
+        if isinstance(self.clock, ServerTimeClock) and self.clock_probes:
+            # 预热的 HEAD 顺便对准服务器的秒边界发出，每次把偏差区间砍半；
+            # 窗口打开前剩的时间不够再等一次、探测一个往返、再留一个往返给签到请求时就停，不把探测拖进窗口
+            est = self.clock.estimator
+            for _ in range(self.clock_probes):
+                delay, rtt = est.probe_delay(), est.rtt or 0.0
+                if (course.sign_begin - self.clock.now()).total_seconds() < delay + 2 * rtt:
+                    break
+                self.clock.base.sleep(delay)
+                probed += 1
+                if not self.client.prewarm(self.sign_url, self.prewarm_timeout, on_date=est.observe):
+                    break
+            logger.info("签到前服务器时钟偏差（探测 %d 次）: %s", probed, est.describe())
+            if probed and self.on_clock_update is not None:
+                self.on_clock_update()
+        if not probed:
+            self.client.prewarm(self.sign_url, self.prewarm_timeout)
+        return payload
+
+    def send(self, course: Course, prepared: Optional[Dict[str, Any]], now: datetime, deadline: datetime) -> Any:
+        payload = dict(prepared) if prepared else self.build_payload(course, self.socket_info())
+        payload["signTime"] = now.strftime("%Y-%m-%d %H:%M:%S")
+        return self.client.send_sign(self.sign_url, payload, deadline=deadline)
+
+
+class SignPacer:
+    """
+    两次签到 POST 之间至少隔 min_interval 秒（防风控）。每次发送前预约一个时间槽，
+    只有要发请求的那个线程等待，调度和其他课程的准备不受影响；等到槽位会越过 deadline 时不再等
+    """
+
+    def __init__(self, min_interval: float = 3.0, clock: Clock = REAL_CLOCK):
+        self.min_interval = min_interval
+        self.clock = clock
+        self._next = float("-inf")
+        self._lock = threading.Lock()
+
+    def wait(self, deadline: Optional[datetime] = None) -> float:
+        """等到可以发送为止，返回等待的秒数"""
+        if self.min_interval <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock.time()
+            slot = max(now, self._next)
+            if deadline is not None and slot >= deadline.timestamp():
+                slot = now
+            self._next = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            self.clock.sleep(delay)
+        return delay
+
+
+@dataclass(slots=True)
+class SignOutcome:
+    course: Course
+    sent: bool                 # False：dry_run，没有发请求
+    ok: bool
+    resp: Any = None
+    sent_at: Optional[datetime] = None
+    paced_sec: float = 0.0     # 为了间隔而等待的秒数
+    error: Optional[str] = None   # 发送前就出错（落盘失败等），请求没有发出
+
+
+class Signer:
+    """
+    签到引擎：prepare / sign 交给一个小线程池，连堂课或启动晚了同时打开的几个窗口并行准备、各自发送，
+    发送之间的间隔由 SignPacer 控制。workers=0 时在调用线程里直接执行（虚拟时钟模拟用）。
+    before_send 在真正发出请求前调用（用于落盘 intent），on_result 在拿到结果后调用，二者都在工作线程里；
+    profiler 打开时每次签到单独一份剖析
+    """
+
+    def __init__(self, strategy: SignStrategy, workers: int = 4, pacer: Optional[SignPacer] = None,
+                 clock: Clock = REAL_CLOCK, retry_budget_sec: float = 20, dry_run: bool = False,
+                 before_send: Optional[Callable[[Course], None]] = None,
+                 on_result: Optional[Callable[[SignOutcome], None]] = None,
+                 profiler: PhaseProfiler = NO_PROFILER):
+        self.strategy = strategy
+        self.pacer = pacer or SignPacer(0, clock)
+        self.clock = clock
+        self.retry_budget_sec = retry_budget_sec
+        self.dry_run = dry_run
+        self.before_send = before_send
+        self.on_result = on_result
+        self.profiler = profiler
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix="signer") if workers > 0 else None
+        self._prepared: Dict[str, Any] = {}
+        self._futures: List[Future] = []
+        self._lock = threading.Lock()
+
+    def _submit(self, fn: Callable, *args) -> None:
+        if self._pool is None:
+            fn(*args)
+            return
+        fut = self._pool.submit(fn, *args)
+        with self._lock:
+            self._futures = [f for f in self._futures if not f.done() or f.exception() is not None]
+            self._futures.append(fut)
+
+    def prepare(self, course: Course) -> None:
+        """窗口打开前的准备（拼表单、预热连接），慢也不会推迟调度器里的下一个事件"""
+        self._submit(self._prepare, course)
+
+    def discard(self, sched_id: str) -> None:
+        """课程窗口变了，丢掉之前准备好的表单"""
+        with self._lock:
+            self._prepared.pop(sched_id, None)
+
+    def sign(self, course: Course) -> None:
+        self._submit(self._sign, course)
+
+    def join(self) -> None:
+        """等所有已提交的准备 / 签到做完；任务里漏出来的异常在这里记日志"""
+        while True:
+            with self._lock:
+                futs, self._futures = self._futures, []
+            if not futs:
+                return
+            wait(futs)
+            for f in futs:
+                exc = f.exception()
+                if exc is not None:
+                    logger.error("签到任务异常: %s", exc, exc_info=exc)
+
+    def shutdown(self) -> None:
+        self.join()
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def _prepare(self, course: Course) -> None:
+        try:
+            prepared = self.strategy.prepare(course)
+        except Exception as e:
+            logger.warning("课程 [%s] 签到准备失败: %s", course.name, e)
+            return
+        if prepared is not None:
+            with self._lock:
+                self._prepared[course.sched_id] = prepared
 
-    def sign_course(self, course):
-        # 获取签到任务
-        task = self.client.get_sign_task(course["id"])
-        if not task or task["code"] != 200:
-            return False, "任务获取失败"
+    def _sign(self, course: Course) -> None:
+        try:
+            with self.profiler.phase(f"sign-{course.sched_id}"):
+                self._sign_once(course)
+        except Exception as e:
+            # before_send（落盘）、pacer 等在发送之外出错：也要交出一个结果，否则这门课会一直停在"签到中"
+            logger.exception("课程 [%s] 签到过程出错", course.name)
+            self._report(SignOutcome(course, sent=False, ok=False, error=str(e)))
 
-        task_id = task["data"]["taskId"]
+    def _report(self, out: SignOutcome) -> None:
+        if self.on_result is not None:
+            try:
+                self.on_result(out)
+            except Exception:
+                logger.exception("处理课程 [%s] 的签到结果出错", out.course.name)
 
-        # 执行签到
-        res = self.client.do_sign(task_id)
-        if res["code"] == 200:
-            return True, "签到成功"
+    def _sign_once(self, course: Course) -> None:
+        with self._lock:
+            prepared = self._prepared.pop(course.sched_id, None)
+        if self.dry_run:
+            logger.info("dry_run 模式，跳过实际请求")
+            out = SignOutcome(course, sent=False, ok=False)
         else:
-            return False, res.get("msg", "unknown error")
+            paced = self.pacer.wait(course.sign_end)
+            if self.before_send is not None:
+                self.before_send(course)
+            now = self.clock.now()
+            resp = None
+            try:
+                deadline = min(course.sign_end, now + timedelta(seconds=self.retry_budget_sec))
+                resp = self.strategy.send(course, prepared, now, deadline)
+                logger.info("课程 [%s] 签到返回 JSON: %s", course.name, resp)          # 你最想要的这一行
+            except Exception as e:
+                logger.error("签到异常: %s", e)
+            out = SignOutcome(course, sent=True, ok=is_sign_success(resp), resp=resp, sent_at=now, paced_sec=paced)
+        self._report(out)
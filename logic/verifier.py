@@ -0,0 +1,85 @@
+# auto_sign_backend/logic/verifier.py
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List
+
+from auto_sign_backend.client.iclass_client import signed_course_ids
+from auto_sign_backend.logic.course import Course
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class _Pending:
+    course: Course
+    sent_ok: bool          # send_sign 的返回是否表示成功
+    checks: int = 0        # 已核对且未确认的次数
+
+
+@dataclass
+class VerifyResult:
+    confirmed: List[Course] = field(default_factory=list)
+    resend: List[Course] = field(default_factory=list)      # 窗口还开着、需要重新签到
+    failed: List[Course] = field(default_factory=list)      # 窗口已关或重发次数用完，放弃
+
+
+class SignVerifier:
+    """
+    签到后的批量核对：每轮只调一次 get_stu_sign_time（整天一次），
+    对照服务端记录确认待核对的课程。未确认的课程在窗口仍开着时交回重签；
+    核对间隔在仍有未确认课程时指数增长，全部确认后复位
+    """
+
+    def __init__(self, client, date_str: str, base_delay: float = 3, max_delay: float = 60, max_resends: int = 2):
+        self.client = client
+        self.date_str = date_str
+        self.base_delay, self.max_delay = base_delay, max_delay
+        self.max_resends = max_resends
+        self.delay = base_delay
+        self._pending: Dict[str, _Pending] = {}
+        self._resends: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def add(self, course: Course, sent_ok: bool) -> None:
+        """登记一次已发送（或结果未知）的签到；重签的课程保留原来的重发计数"""
+        with self._lock:
+            self._pending[course.sched_id] = _Pending(course, sent_ok)
+            self.delay = self.base_delay
+
+    def check(self, now: datetime) -> VerifyResult:
+        out = VerifyResult()
+        with self._lock:
+            if not self._pending:
+                return out
+        try:
+            confirmed = signed_course_ids(self.client.get_stu_sign_time(self.date_str))
+        except Exception as e:
+            logger.warning("核对签到记录失败，稍后重试: %s", e)
+            with self._lock:
+                self.delay = min(self.max_delay, self.delay * 2)
+            return out
+
+        with self._lock:
+            for sid, p in list(self._pending.items()):
+                if sid in confirmed:
+                    out.confirmed.append(p.course)
+                    del self._pending[sid]
+                    continue
+                p.checks += 1
+                if now > p.course.sign_end or self._resends.get(sid, 0) >= self.max_resends:
+                    out.failed.append(p.course)
+                    del self._pending[sid]
+                elif not p.sent_ok or p.checks >= 2:
+                    # 发送失败的立即重签；返回成功但查不到的多等一轮，给服务端入库留时间
+                    self._resends[sid] = self._resends.get(sid, 0) + 1
+                    out.resend.append(p.course)
+                    del self._pending[sid]
+            self.delay = self.base_delay if not self._pending and not out.resend \
+                else min(self.max_delay, self.delay * 2)
+        return out
@@ -1,175 +1,536 @@
 # auto_sign_backend/run.py
 # 最终版：极简美观 + 连堂课永不漏签 + 你最爱的日志风格
 
-import os
-import time
+import signal
 import logging
-from datetime import datetime
+import argparse
+import threading
+from datetime import timedelta
+from typing import Optional
 
 from auto_sign_backend.client.iclass_client import IClassClient
-from auto_sign_backend.utils.coords import parse_coord
-from auto_sign_backend.logic.scheduler import build_sign_windows
+from auto_sign_backend.client.bootstrap import bootstrap
+from auto_sign_backend.store.session_store import SessionStore
+from auto_sign_backend.store.schedule_store import ScheduleStore, parse_qxkt_sign_time, start_prefetch
+from auto_sign_backend.store import sign_journal
+from auto_sign_backend.store.sign_journal import SignJournal
+from auto_sign_backend.utils.http_retry import RetryPolicy, add_request_hook
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+from auto_sign_backend.utils.server_clock import ServerClockEstimator, ServerTimeClock
+from auto_sign_backend.utils.profiling import PhaseProfiler, NO_PROFILER
+from auto_sign_backend.utils import notify as notifications
+from auto_sign_backend.utils.notify import Notifier, make_sender
+from auto_sign_backend.utils.status_server import StatusBoard
+from auto_sign_backend import cli
+from auto_sign_backend.config import DEFAULT_CONFIG, load_config   # noqa: F401  兼容旧的 run.load_config 用法
+from auto_sign_backend.logic.course import parse_courses, sched_ok
+from auto_sign_backend.logic.planner import Planner
+from auto_sign_backend.logic.refresher import ScheduleRefresher
+from auto_sign_backend.logic.verifier import SignVerifier
+from auto_sign_backend.logic.signer import AutoSignStrategy, SignPacer, Signer
+from auto_sign_backend.logic.event_scheduler import EventScheduler
 
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
-# ====================== 配置 ======================
-DEFAULT_CONFIG = {
-    "base_url": "https://iclass.buaa.edu.cn:8181",
-    "ve_base_url": "http://iclass.buaa.edu.cn:88",
-    "phone": os.getenv("ICLASS_PHONE", "25375093"),
-    "password_env_var": "SIGN_PASS",
-    "password": None,
-    "sign_url": "https://iclass.buaa.edu.cn:8181/app/course/stu_auto_sign.action",
-    "dry_run": False,
-    "verify_ssl": False,
-    "timeout_sec": 10,
-    "before_minute_default": 5,
-    "after_minute_default": 30,
-    "fake_longitude": 116.397451,
-    "fake_latitude": 39.909187,
-    "manual_mac": "A0:EE:1A:E0:A2:0E",
-    "log_file": "auto_sign.log",
-}
-
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 logger = logging.getLogger("auto_sign")
 
-def load_config():
-    cfg = DEFAULT_CONFIG.copy()
-    cfg["password"] = cfg["password"] or os.environ.get(cfg["password_env_var"])
-    if not cfg["password"]:
-        logger.warning("未找到密码，请检查环境变量 SIGN_PASS")
-    return cfg
+def make_client(cfg: dict, clock: Clock = REAL_CLOCK) -> IClassClient:
+    store = SessionStore(cfg["session_cache_file"], cfg["session_ttl_sec"]) if cfg.get("session_cache_file") else None
+    return IClassClient(cfg["base_url"], cfg["ve_base_url"],
+                        verify_ssl=cfg["verify_ssl"], timeout=cfg["timeout_sec"],
+                        session_store=store,
+                        retry_policy=RetryPolicy(cfg["max_retries"], cfg["retry_backoff"], cfg["retry_max_backoff"]),
+                        clock=clock, socket_info_ttl=cfg["socket_info_ttl_sec"])
 
-def run_auto_sign(cfg: dict):
-    # 日志同时写文件
-    if cfg["log_file"]:
-        fh = logging.FileHandler(cfg["log_file"], encoding="utf-8")
-        fh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
-        logger.addHandler(fh)
+def make_clock(cfg: dict, base: Clock = REAL_CLOCK) -> Clock:
+    """server_clock 打开时返回按服务器时间报时的时钟，并注册请求钩子收集 Date 样本"""
+    if not cfg.get("server_clock"):
+        return base
+    estimator = ServerClockEstimator(cfg["server_clock_window"], clock=base)
+    add_request_hook(estimator.on_request)
+    return ServerTimeClock(base, estimator)
 
-    client = IClassClient(cfg["base_url"], cfg["ve_base_url"],
-                          verify_ssl=cfg["verify_ssl"], timeout=cfg["timeout_sec"])
+def make_notifier(cfg: dict) -> Optional[Notifier]:
+    """按配置创建后台通知；没有配置推送通道时返回 None"""
+    sender = make_sender(cfg["notify_sender"], cfg["push_key"], cfg["notify_webhook_url"], cfg["notify_file"])
+    if sender is None:
+        return None
+    return Notifier(sender, queue_size=cfg["notify_queue_size"], batch_sec=cfg["notify_batch_sec"],
+                    dedupe_sec=cfg["notify_dedupe_sec"])
 
-    # 登录
-    try:
-        client.login(cfg["phone"], cfg["password"])
-    except Exception as e:
-        logger.exception("登录失败: %s", e)
-        return
+def run_auto_sign(cfg: dict, client: Optional[IClassClient] = None, clock: Clock = REAL_CLOCK,
+                  scheduler: Optional[EventScheduler] = None, notifier: Optional[Notifier] = None,
+                  status: Optional[StatusBoard] = None, profiler: PhaseProfiler = NO_PROFILER) -> bool:
+    """
+    跑完一天的自动签到。client/clock 可注入：模拟模式下传入离线 client 和 SimulatedClock，
+    整天的课表在毫秒内跑完；常驻模式传入同一个 client 跨天复用登录态，
+    并传入 scheduler 以便收到 SIGTERM 时 stop()。notifier 只入队，不等推送结果；
+    status 在每个事件处理完后发布一份课程状态快照，供状态服务读取；
+    profiler 打开时启动阶段和每次签到各写一份 CPU / 内存剖析。
+    登录或取课程表失败返回 False，其余（含今天没课）返回 True
+    """
+    if client is None:
+        client = make_client(cfg, clock)
+    notify = notifier.notify if notifier is not None else (lambda *a, **kw: False)
+
+    # 签到时间配置有本地缓存时直接用；今日课程表总是实时拉取，拉取失败或服务端报错时才退回本地缓存
+    today = clock.now().strftime("%Y%m%d")
+    sched_store = ScheduleStore(cfg["schedule_db"]) if cfg.get("schedule_db") else None
+    cached_sign_time = sched_store.get_sign_time() if sched_store else None
+    skip = set()
+    if cached_sign_time is not None:
+        skip.add("qxkt_sign_time")
+
+    # 登录后并发拉取课程表 / 签到时间配置 / socket_info
+    with profiler.phase("bootstrap", threads=True):
+        boot = bootstrap(client, cfg["phone"], cfg["password"], today, skip=skip)
+    if status is not None:
+        status.publish(date=today, state="login", courses=[], next_event=None)
+    if not boot.ok("login"):
+        if status is not None:
+            status.publish(state="login_failed")
+        logger.error("登录失败: %s", boot.errors.get("login"), exc_info=boot.errors.get("login"))
+        notify(notifications.LOGIN_FAILED, "iClass 登录失败", str(boot.errors.get("login")))
+        return False
+    if isinstance(clock, ServerTimeClock):
+        logger.info("服务器时钟偏差: %s", clock.estimator.describe())
 
     # 取今日课程
-    today = datetime.now().strftime("%Y%m%d")
-    try:
-        sched = client.get_course_sched(today)
-    except Exception as e:
-        logger.exception("获取课程表失败: %s", e)
-        return
+    sched = boot.get("course_sched") if boot.ok("course_sched") else None
+    if sched_ok(sched):
+        if sched_store:
+            sched_store.put_day(today, sched)
+    else:
+        err = boot.errors.get("course_sched") or (sched.get("ERRMSG") if isinstance(sched, dict) else sched)
+        cached_sched = sched_store.get_day(today) if sched_store else None
+        if sched_ok(cached_sched):
+            logger.warning("获取课程表失败，使用本地缓存的今日课程表: %s", err)
+            sched = cached_sched
+        else:
+            sched = None
+    if sched is None:
+        logger.error("获取课程表失败: %s", err, exc_info=boot.errors.get("course_sched"))
+        notify(notifications.SCHED_FAILED, "获取课程表失败", str(err), key=f"sched:{today}")
+        if status is not None:
+            status.publish(state="sched_failed")
+        return False
+
+    if sched_store:
+        start_prefetch(client, sched_store, cfg["prefetch_days"], start=clock.now())
 
-    courses = sched.get("result", []) if isinstance(sched, dict) else []
+    # 签到窗口参数
+    sign_time = cached_sign_time or parse_qxkt_sign_time(boot.get("qxkt_sign_time"))
+    if sign_time:
+        before_min, after_min = sign_time
+        if sched_store and not cached_sign_time:
+            sched_store.put_sign_time(before_min, after_min)
+    else:
+        before_min = cfg["before_minute_default"]
+        after_min  = cfg["after_minute_default"]
+
+    # 课程表一次解析成 Course（时间、经纬度、签到窗口都预先算好）
+    courses = parse_courses(sched, before_min, after_min, cfg["fake_longitude"], cfg["fake_latitude"])
+    planner = Planner(courses)
     if not courses:
         logger.info("今天没有课程")
-        return
+        if status is not None:
+            status.publish(state="done")
+        return True
 
     # 你最爱的三条日志
     logger.info("今天课程列表（含教室经纬度）:")
     for i, c in enumerate(courses, 1):
-        lon = parse_coord(c.get("classroomLongitude"), cfg["fake_longitude"])
-        lat = parse_coord(c.get("classroomLongitude"), cfg["fake_latitude"])
         logger.info("%d. %s (教室: %s) 经度: %.6f, 纬度: %.6f, 开始: %s, 结束: %s, id=%s",
-                    i, c.get("courseName", "未知"), c.get("classroomName", "未知"),
-                    lon, lat,
-                    c.get("classBeginTime", "未知"), c.get("classEndTime", "未知"),
-                    c.get("courseSchedId", c.get("id", "未知")))
-
-    # 构建签到窗口并打印
-    try:
-        qxkt = client.get_qxkt_sign_time()
-        before_min = int(qxkt.get("result", [{}])[0].get("before_minute", cfg["before_minute_default"])) if qxkt.get("result") else cfg["before_minute_default"]
-        after_min  = int(qxkt.get("result", [{}])[0].get("after_minute", cfg["after_minute_default"])) if qxkt.get("result") else cfg["after_minute_default"]
-    except:
-        before_min = cfg["before_minute_default"]
-        after_min  = cfg["after_minute_default"]
-
-    courses = build_sign_windows(courses, before_min, after_min)
+                    i, c.name, c.classroom, c.longitude, c.latitude,
+                    c.begin.strftime("%Y-%m-%d %H:%M:%S"), c.end.strftime("%Y-%m-%d %H:%M:%S"),
+                    c.sched_id)
 
     for c in courses:
         logger.info("课程 %s 签到窗口: %s ~ %s",
-                    c.get("courseName"),
-                    c["sign_begin"].strftime("%Y-%m-%d %H:%M:%S"),
-                    c["sign_end"].strftime("%Y-%m-%d %H:%M:%S"))
+                    c.name,
+                    c.sign_begin.strftime("%Y-%m-%d %H:%M:%S"),
+                    c.sign_end.strftime("%Y-%m-%d %H:%M:%S"))
 
     logger.info("自动选择全部课程，共 %d 门。", len(courses))
-    logger.info("进入自动签到检测循环（每分钟检测一次，直到所有课程签到完成）")
+    logger.info("进入自动签到调度（按签到窗口精确唤醒，直到所有课程签到完成）")
 
-    # ========== 核心循环（已完美解决连堂课）==========
+    # ========== 核心调度（已完美解决连堂课）==========
     signed = set()
+    missed = set()
+    signed_lock = threading.Lock()   # 启动后调度、刷新、核对、签到线程都会改 signed / missed，改动和取快照都在锁内
+    journal = None
+    if cfg.get("journal_file"):
+        journal = SignJournal(cfg["journal_file"])
+        journal.compact((clock.now() - timedelta(days=cfg["journal_keep_days"])).strftime("%Y%m%d"))
+
+    scheduler = scheduler or EventScheduler(clock)
+    by_id = {c.sched_id: c for c in courses}
+    by_id_lock = threading.Lock()    # 刷新线程的 on_change 会往 by_id 里加课，publish 在锁内取副本
+    states = {c.sched_id: "pending" for c in courses}    # 状态服务展示用，只有 publish 读取
+
+    def publish(state="running"):
+        if status is None:
+            return
+        ev = scheduler.next_event()
+        with by_id_lock:
+            current = list(by_id.values())
+        nxt = None
+        if ev is not None:
+            nxt = {"kind": ev.kind, "key": ev.key, "when": ev.when.strftime("%Y-%m-%d %H:%M:%S"),
+                   "ts": ev.when.timestamp()}
+        status.publish(date=today, state=state, next_event=nxt, courses=[
+            {"id": c.sched_id, "name": c.name, "classroom": c.classroom,
+             "sign_begin": c.sign_begin.strftime("%Y-%m-%d %H:%M:%S"),
+             "sign_end": c.sign_end.strftime("%Y-%m-%d %H:%M:%S"), "state": states.get(c.sched_id, "pending")}
+            for c in sorted(current, key=lambda c: c.sign_begin)],
+            server_clock=clock.estimator.describe() if isinstance(clock, ServerTimeClock) else None)
+
+    workers = []           # 刷新 / 核对的后台线程，调度结束后等它们收尾
+    verifier = None
+    if cfg["verify_delay_sec"] and not cfg["dry_run"]:
+        verifier = SignVerifier(client, today, cfg["verify_delay_sec"], cfg["verify_max_delay_sec"],
+                                cfg["verify_max_resends"])
+
+    def schedule_verify():
+        if not any(ev.kind == "verify" for ev in scheduler.pending()):
+            scheduler.schedule(clock.now() + timedelta(seconds=verifier.delay), "verify", key="verify")
+
+    def schedule_windows(c, now):
+        if c.sign_begin <= now:
+            logger.info("课程 [%s] 的签到窗口已打开，立即签到。", c.name)
+        elif cfg["prewarm_lead_sec"]:
+            scheduler.schedule(c.sign_begin - timedelta(seconds=cfg["prewarm_lead_sec"]),
+                               "prewarm", key=c.sched_id, payload=c)
+        scheduler.schedule(c.sign_begin, "sign_begin", key=c.sched_id, payload=c)
+        scheduler.schedule(c.sign_end, "sign_end", key=c.sched_id, payload=c)
+
+    now = clock.now()
+    for c in planner.ended(now):
+        # 启动时窗口已经结束的课程不再进调度
+        signed.add(c.sched_id)
+        missed.add(c.sched_id)
+        states[c.sched_id] = "missed"
+        if journal and journal.state(today, c.sched_id) is None:
+            journal.record(today, c.sched_id, sign_journal.MISSED)
+        logger.warning("课程 [%s] 签到窗口已在启动前结束。", c.name)
+
+    for c in planner.pending(now):
+        sched_id = c.sched_id
+        state = journal.state(today, sched_id) if journal else None
+        if state in (sign_journal.DONE, sign_journal.MISSED):
+            signed.add(sched_id)
+            states[sched_id] = "signed" if state == sign_journal.DONE else "missed"
+            logger.info("课程 [%s] 签到日志记录为 %s，跳过。", c.name, state)
+            continue
+        if state == sign_journal.INTENT:
+            # 上次在发送过程中退出，请求可能已被服务端受理，不盲目重发，先向服务端核对
+            signed.add(sched_id)
+            states[sched_id] = "unknown"
+            if verifier is not None:
+                states[sched_id] = "verifying"
+                logger.warning("课程 [%s] 上次签到请求结果未知，先核对服务端记录。", c.name)
+                verifier.add(c, sent_ok=False)
+                schedule_verify()
+            else:
+                logger.warning("课程 [%s] 上次签到请求结果未知，不重复发送。", c.name)
+            continue
+        schedule_windows(c, now)
+
+    # 课表刷新：后台重新拉取今日课程表，只重排有变化的课程
+    refresher = None
+    if cfg["schedule_refresh_max_sec"]:
+        refresher = ScheduleRefresher(client, today, courses, sched, before_min, after_min,
+                                      cfg["fake_longitude"], cfg["fake_latitude"],
+                                      min_interval=cfg["schedule_refresh_min_sec"],
+                                      max_interval=cfg["schedule_refresh_max_sec"],
+                                      near_sec=cfg["schedule_refresh_near_sec"], store=sched_store)
 
-    while True:
-        now = datetime.now()
-        all_done = True
+    def schedule_refresh():
+        now = clock.now()
+        if any(ev.kind != "refresh" for ev in scheduler.pending()):
+            with signed_lock:
+                done = frozenset(signed)
+            scheduler.schedule(now + timedelta(seconds=refresher.interval(now, done)), "refresh", key="refresh")
 
-        for c in courses:
-            sched_id = c.get("courseSchedId") or c.get("id")
-            if sched_id in signed:
+    def drop_idle_refresh():
+        # 只剩刷新事件时撤掉它，所有课程处理完就退出
+        if refresher and all(ev.kind == "refresh" for ev in scheduler.pending()):
+            scheduler.cancel_key("refresh")
+
+    def on_change(diff):
+        now = clock.now()
+        for c in diff.removed:
+            if c.sched_id not in signed:
+                scheduler.cancel_key(c.sched_id)
+                states[c.sched_id] = "removed"
+                logger.warning("课程 [%s] 已从今日课表中移除，取消签到。", c.name)
+        for c in diff.added + diff.changed:
+            with by_id_lock:
+                by_id[c.sched_id] = c
+            with signed_lock:
+                if c.sched_id in missed and c.sign_end >= now:
+                    # 调课后窗口挪到了后面，重新给机会
+                    missed.discard(c.sched_id)
+                    signed.discard(c.sched_id)
+            if c.sched_id in signed:
                 continue
+            scheduler.cancel_key(c.sched_id)
+            signer.discard(c.sched_id)
+            logger.info("课程 [%s] 签到窗口更新为 %s ~ %s", c.name,
+                        c.sign_begin.strftime("%Y-%m-%d %H:%M:%S"), c.sign_end.strftime("%Y-%m-%d %H:%M:%S"))
+            if c.sign_end >= now:
+                states[c.sched_id] = "pending"
+                schedule_windows(c, now)
+        publish()
 
-            if now >= c["sign_begin"]:                     # 只要到了开始时间就签
-                all_done = False
-                logger.info("检测到课程 [%s] 进入签到窗口，准备签到...", c.get("courseName"))
-
-                # 位置
-                try:
-                    r = client.get_socket_info().get("result", {})
-                except:
-                    r = {}
-                mac = cfg["manual_mac"] or "00:db:6e:66:8a:d8"
-                lon = parse_coord(r.get("classroomLongitude"), parse_coord(c.get("classroomLongitude"), cfg["fake_longitude"]))
-                lat = parse_coord(r.get("classroomLatitude"), parse_coord(c.get("classroomLatitude"), cfg["fake_latitude"]))
-
-                payload = {
-                    "id": client.user_id,
-                    "courseSchedId": sched_id,
-                    "routerInfo": mac,
-                    "longitude": lon,
-                    "latitude": lat,
-                    "machineInfo": "Android",
-                    "signTime": now.strftime("%Y-%m-%d %H:%M:%S")
-                }
-
-                if cfg["dry_run"]:
-                    logger.info("dry_run 模式，跳过实际请求")
-                else:
-                    try:
-                        resp = client.send_sign(cfg["sign_url"], payload)
-                        logger.info("签到返回 JSON: %s", resp)          # 你最想要的这一行
-                    except Exception as e:
-                        logger.error("签到异常: %s", e)
+    if refresher:
+        schedule_refresh()
 
-                signed.add(sched_id)
-                logger.info("课程 [%s] 签到完成。", c.get("courseName"))
-                time.sleep(3)          # 防风控
+    def verify_round():
+        res = verifier.check(clock.now())
+        for c in res.confirmed:
+            states[c.sched_id] = "verified"
+            if journal:
+                journal.record(today, c.sched_id, sign_journal.DONE, verified=True)
+            logger.info("服务端已确认课程 [%s] 的签到记录。", c.name,
+                        extra={"event": "verified", "courseSchedId": c.sched_id})
+            notify(notifications.SIGN_OK, f"签到成功：{c.name}", f"{c.classroom}，{c.begin:%H:%M} 上课",
+                   key=f"sign:{today}:{c.sched_id}")
+        for c in res.failed:
+            states[c.sched_id] = "unverified"
+            if journal:
+                journal.record(today, c.sched_id, sign_journal.FAILED, verified=False)
+            logger.error("课程 [%s] 核对不到签到记录，放弃。", c.name,
+                         extra={"event": "unverified", "courseSchedId": c.sched_id})
+            notify(notifications.SIGN_FAILED, f"签到失败：{c.name}", "服务端没有签到记录",
+                   key=f"sign:{today}:{c.sched_id}")
+        for c in res.resend:
+            logger.warning("课程 [%s] 核对不到签到记录，窗口未关，重新签到。", c.name,
+                           extra={"event": "resend", "courseSchedId": c.sched_id})
+            with signed_lock:
+                signed.discard(c.sched_id)
+            states[c.sched_id] = "pending"
+            scheduler.cancel_key(c.sched_id)
+            schedule_windows(c, clock.now())
+        if len(verifier):
+            scheduler.schedule(clock.now() + timedelta(seconds=verifier.delay), "verify", key="verify")
+        drop_idle_refresh()
+        publish()
 
-            elif now < c["sign_begin"]:
-                all_done = False
+    def before_send(c):
+        if journal:
+            journal.record(today, c.sched_id, sign_journal.INTENT)
 
-        if all_done:
-            logger.info("所有课程均已签到完成，程序退出。")
-            break
+    def on_signed(out):
+        c = out.course
+        sched_id = c.sched_id
+        if out.error is not None:
+            # 请求没发出去：有核对时交给核对，窗口未关就按重签次数上限再签；否则直接报失败
+            states[sched_id] = "failed"
+            if verifier is not None:
+                verifier.add(c, False)
+                states[sched_id] = "verifying"
+                schedule_verify()
+            else:
+                notify(notifications.SIGN_FAILED, f"签到失败：{c.name}", out.error[:200], key=f"sign:{today}:{sched_id}")
+        elif not out.sent:
+            states[sched_id] = "dry_run"
+        else:
+            states[sched_id] = "signed" if out.ok else "failed"
+            if journal:
+                journal.record(today, sched_id, sign_journal.DONE if out.ok else sign_journal.FAILED,
+                               resp=str(out.resp)[:200])
+            if verifier is not None:
+                # 不论返回什么都交给批量核对，服务端没记录的在窗口内重签；核对完再通知
+                verifier.add(c, out.ok)
+                states[sched_id] = "verifying"
+                schedule_verify()
+            elif out.ok:
+                notify(notifications.SIGN_OK, f"签到成功：{c.name}", f"{c.classroom}，{c.begin:%H:%M} 上课",
+                       key=f"sign:{today}:{sched_id}")
+            else:
+                notify(notifications.SIGN_FAILED, f"签到失败：{c.name}", str(out.resp)[:200],
+                       key=f"sign:{today}:{sched_id}")
+        scheduler.cancel_key(sched_id, "sign_end")
+        logger.info("课程 [%s] 签到完成。", c.name,
+                    extra={"event": "signed", "courseSchedId": sched_id,
+                           "latency_ms": round((clock.now() - c.sign_begin).total_seconds() * 1000, 1)})
+        drop_idle_refresh()
+        publish()
+
+    # 签到引擎：窗口打开前准备表单 / 预热连接，窗口打开时发送，请求之间按 sign_pacing_sec 间隔
+    strategy = AutoSignStrategy(client, cfg["sign_url"], cfg["manual_mac"], boot.get("socket_info"),
+                                prewarm_timeout=cfg["prewarm_lead_sec"], clock=clock,
+                                clock_probes=cfg["server_clock_probes"], on_clock_update=scheduler.wake)
+    signer = Signer(strategy, workers=cfg["sign_workers"], pacer=SignPacer(cfg["sign_pacing_sec"], clock),
+                    clock=clock, retry_budget_sec=cfg["sign_retry_budget_sec"], dry_run=cfg["dry_run"],
+                    before_send=before_send, on_result=on_signed, profiler=profiler)
+
+    def on_event(ev):
+        handle(ev)
+        publish()
+
+    def handle(ev):
+        # 刷新 / 核对放到后台线程，请求慢也不会推迟下一门课的签到；
+        # sign_workers=0（虚拟时钟模拟）时和签到一样在调度线程里直接做，虚拟时间不会在请求途中往前跳
+        if ev.kind == "refresh":
+            if cfg["sign_workers"]:
+                workers.append(refresher.start(on_change))
+            else:
+                refresher.refresh(on_change)
+            schedule_refresh()
+            return
+
+        if ev.kind == "verify":
+            if cfg["sign_workers"]:
+                t = threading.Thread(target=verify_round, name="sign-verify", daemon=True)
+                t.start()
+                workers.append(t)
+            else:
+                verify_round()
+            return
+
+        c = ev.payload
+        sched_id = ev.key
+        if sched_id in signed:
+            return
+        now = clock.now()
+
+        if ev.kind == "prewarm":
+            signer.prepare(c)
+            return
+
+        if ev.kind == "sign_end":
+            with signed_lock:
+                signed.add(sched_id)
+                missed.add(sched_id)
+            states[sched_id] = "missed"
+            if journal:
+                journal.record(today, sched_id, sign_journal.MISSED)
+            logger.warning("课程 [%s] 签到窗口已结束，未能签到。", c.name,
+                           extra={"event": "missed", "courseSchedId": sched_id})
+            notify(notifications.SIGN_FAILED, f"漏签：{c.name}", "签到窗口已结束", key=f"sign:{today}:{sched_id}")
+            drop_idle_refresh()
+            return
 
-        time.sleep(60)
+        if now > c.sign_end:
+            # 启动时窗口已经过去，交给 sign_end 事件记录
+            return
 
-def main():
-    cfg = load_config()
-    if not cfg.get("ve_base_url"):
-        cfg["ve_base_url"] = cfg["base_url"].replace(":8181", ":88") if ":8181" in cfg["base_url"] else cfg["base_url"]
+        logger.info("检测到课程 [%s] 进入签到窗口，准备签到...", c.name,
+                    extra={"event": "window_open", "courseSchedId": sched_id,
+                           "latency_ms": round((now - c.sign_begin).total_seconds() * 1000, 1)})
+        if isinstance(clock, ServerTimeClock):
+            logger.info("按服务器时间触发，时钟偏差 %s", clock.estimator.describe())
 
+        # 先登记，后台刷新课表时不会把正在签到的课程重排一遍；准备和发送都在签到线程池里
+        with signed_lock:
+            signed.add(sched_id)
+        states[sched_id] = "signing"
+        signer.sign(c)
+
+    publish()
     try:
-        run_auto_sign(cfg)
-    except KeyboardInterrupt:
-        print("\n签到程序已手动停止，祝你好运~")
-        logger.info("程序被手动终止")
+        while True:
+            scheduler.run(on_event)
+            # 在途的签到、后台的刷新 / 核对可能在调度结束后又排进了核对 / 重签事件
+            signer.join()
+            while workers:
+                workers.pop().join()
+            if scheduler.stopped or not len(scheduler):
+                break
+    finally:
+        signer.shutdown()
+        if journal:
+            journal.close()
+    publish("stopped" if scheduler.stopped else "done")
+    if scheduler.stopped:
+        logger.info("签到调度已停止。")
+    else:
+        logger.info("所有课程均已签到完成，程序退出。")
+    return True
+
+def next_rollover(now, rollover: str):
+    """下一次跨天重建窗口的时刻（rollover 形如 "00:05"）"""
+    h, m = map(int, rollover.split(":"))
+    t = now.replace(hour=h, minute=m, second=0, microsecond=0)
+    return t if t > now else t + timedelta(days=1)
+
+def run_daemon(cfg: dict, client: Optional[IClassClient] = None, clock: Clock = REAL_CLOCK,
+               install_signals: bool = True, stop: Optional[threading.Event] = None,
+               notifier: Optional[Notifier] = None, status: Optional[StatusBoard] = None,
+               profiler: PhaseProfiler = NO_PROFILER) -> None:
+    """
+    常驻模式：一个已登录的 client 跨天复用，每天 rollover 时刻重建当天签到窗口，
+    两天之间完全空闲（只等一个定时事件）。SIGTERM/SIGINT 时停止当前调度并退出
+    """
+    client = client or make_client(cfg, clock)
+    stop = stop or threading.Event()
+    current = [None]
+
+    def shutdown(signum=None, frame=None):
+        logger.info("收到停止信号，正在退出常驻模式")
+        stop.set()
+        if current[0] is not None:
+            current[0].stop()
+
+    if install_signals and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, shutdown)
+
+    def idle_until(when):
+        idle = EventScheduler(clock)
+        current[0] = idle
+        if not stop.is_set():
+            idle.schedule(when, "rollover")
+            idle.run(lambda ev: None)
+
+    while not stop.is_set():
+        day = clock.now().date()
+        current[0] = EventScheduler(clock)
+        ok = run_auto_sign(cfg, client, clock, scheduler=current[0], notifier=notifier, status=status,
+                           profiler=profiler)
+        if stop.is_set():
+            break
+        wake = next_rollover(clock.now(), cfg["daemon_rollover"])
+        if not ok and clock.now().date() == day:
+            # 登录或课程表失败：当天稍后重试，而不是等到明天
+            wake = min(wake, clock.now() + timedelta(seconds=cfg["daemon_retry_sec"]))
+        logger.info("常驻模式空闲，下次唤醒: %s", wake.strftime("%Y-%m-%d %H:%M:%S"))
+        if status is not None:
+            status.publish(state="idle", next_event={"kind": "rollover", "key": None,
+                                                     "when": wake.strftime("%Y-%m-%d %H:%M:%S"),
+                                                     "ts": wake.timestamp()})
+        idle_until(wake)
+    logger.info("常驻模式已退出")
+
+def main(argv=None):
+    """旧的 python -m auto_sign_backend.run 用法：把 --daemon / --plan / --log-stats 等开关转成 cli 子命令"""
+    ap = argparse.ArgumentParser(description="iClass 自动签到（新用法见 python -m auto_sign_backend --help）")
+    ap.add_argument("--daemon", action="store_true", help="常驻模式：跨天运行，每天自动重建签到窗口")
+    ap.add_argument("--plan", action="store_true", help="只查看签到计划（默认一学期），不签到")
+    ap.add_argument("--days", type=int, help="--plan 加载的天数，默认取配置 plan_days")
+    ap.add_argument("--ics", help="--plan 时导出 iCalendar 文件")
+    ap.add_argument("--profile", action="store_true", help="对启动阶段和每次签到做 cProfile 剖析")
+    ap.add_argument("--trace-malloc", action="store_true",
+                    help="用 tracemalloc 记录启动阶段和每次签到的内存分配（配合 python -X tracemalloc 可看到 import 阶段）")
+    ap.add_argument("--log-stats", nargs="*", metavar="LOG",
+                    help="统计历史日志（默认 log_file 及其轮转文件）的签到延迟分位数和接口重试/失败，不签到")
+    ap.add_argument("--since", help="--log-stats 只统计该日期（YYYY-MM-DD）及之后的日志")
+    ap.add_argument("--until", help="--log-stats 只统计该日期（YYYY-MM-DD）之前的日志")
+    args = ap.parse_args(argv)
+
+    if args.log_stats is not None:
+        sub = ["log-stats", *args.log_stats]
+        sub += ["--since", args.since] if args.since else []
+        sub += ["--until", args.until] if args.until else []
+    elif args.plan:
+        sub = ["plan"] + (["--days", str(args.days)] if args.days else []) + (["--ics", args.ics] if args.ics else [])
+    else:
+        sub = ["run"] + [flag for flag, on in (("--daemon", args.daemon), ("--profile", args.profile),
+                                                ("--trace-malloc", args.trace_malloc)) if on]
+    return cli.main(sub)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    raise SystemExit(main())
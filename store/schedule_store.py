@@ -0,0 +1,149 @@
+# auto_sign_backend/store/schedule_store.py
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from auto_sign_backend.logic.course import sched_ok
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedule_days (
+    date_str     TEXT PRIMARY KEY,
+    content_hash TEXT NOT NULL,
+    payload      TEXT NOT NULL,
+    fetched_at   REAL NOT NULL,
+    checked_at   REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS kv (
+    key        TEXT PRIMARY KEY,
+    value      TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def content_hash(sched: Any) -> str:
+    """
+    课程表内容哈希：只看 result 列表，按 JSON 规范化（键排序、课程按 id 排序），
+    这样服务端返回的时间戳等无关字段变化不会被当成课表变更
+    """
+    courses = sched.get("result", []) if isinstance(sched, dict) else []
+    courses = sorted(courses, key=lambda c: str(c.get("courseSchedId") or c.get("id") or "")) if isinstance(courses, list) else courses
+    blob = json.dumps(courses, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class ScheduleStore:
+    """
+    本地课程表缓存（sqlite3）：按日期保存 get_course_sched 的原始响应和内容哈希，
+    另有一张 kv 表保存 getQxktSignTime 的 before/after_minute
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_day(self, date_str: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM schedule_days WHERE date_str = ?", (date_str,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_day_hash(self, date_str: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM schedule_days WHERE date_str = ?", (date_str,)).fetchone()
+        return row[0] if row else None
+
+    def put_day(self, date_str: str, sched: Dict[str, Any]) -> bool:
+        """写入一天的课程表；内容哈希未变时只更新 checked_at，返回是否有变化"""
+        h = content_hash(sched)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM schedule_days WHERE date_str = ?", (date_str,)).fetchone()
+            if row and row[0] == h:
+                self._conn.execute("UPDATE schedule_days SET checked_at = ? WHERE date_str = ?", (now, date_str))
+                return False
+            self._conn.execute(
+                "INSERT OR REPLACE INTO schedule_days (date_str, content_hash, payload, fetched_at, checked_at) VALUES (?, ?, ?, ?, ?)",
+                (date_str, h, json.dumps(sched, ensure_ascii=False), now, now))
+            return True
+
+    def prune_before(self, date_str: str) -> int:
+        with self._lock:
+            return self._conn.execute("DELETE FROM schedule_days WHERE date_str < ?", (date_str,)).rowcount
+
+    def get_kv(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_kv(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO kv (key, value, updated_at) VALUES (?, ?, ?)",
+                               (key, json.dumps(value, ensure_ascii=False), time.time()))
+
+    def get_sign_time(self) -> Optional[Tuple[int, int]]:
+        v = self.get_kv("qxkt_sign_time")
+        return (int(v[0]), int(v[1])) if v else None
+
+    def put_sign_time(self, before_min: int, after_min: int) -> None:
+        self.put_kv("qxkt_sign_time", [before_min, after_min])
+
+
+def parse_qxkt_sign_time(qxkt: Any) -> Optional[Tuple[int, int]]:
+    """从 getQxktSignTime 响应里取 before/after_minute，取不到返回 None"""
+    try:
+        first = qxkt["result"][0]
+        return int(first["before_minute"]), int(first["after_minute"])
+    except Exception:
+        return None
+
+
+def prefetch(client, store: ScheduleStore, days: int = 7, start: Optional[datetime] = None) -> Dict[str, bool]:
+    """
+    拉取从 start 起 days 天的课程表写入本地，返回 {date_str: 是否变化}；
+    单日失败（请求异常、返回非 JSON、STATUS 不为 0 的错误响应）只跳过该日，保留旧数据
+    """
+    start = start or datetime.now()
+    changed = {}
+    for i in range(days):
+        date_str = (start + timedelta(days=i)).strftime("%Y%m%d")
+        try:
+            sched = client.get_course_sched(date_str)
+        except Exception as e:
+            logger.warning("预取 %s 课程表失败，保留本地数据: %s", date_str, e)
+            continue
+        if not sched_ok(sched):
+            logger.warning("预取 %s 课程表返回错误，保留本地数据: %s", date_str,
+                           sched.get("ERRMSG") if isinstance(sched, dict) else sched)
+            continue
+        changed[date_str] = store.put_day(date_str, sched)
+    try:
+        st = parse_qxkt_sign_time(client.get_qxkt_sign_time())
+        if st:
+            store.put_sign_time(*st)
+    except Exception as e:
+        logger.warning("预取签到时间配置失败: %s", e)
+    store.prune_before((start - timedelta(days=1)).strftime("%Y%m%d"))
+    logger.info("课程表预取完成：%d 天，变化 %d 天", len(changed), sum(changed.values()))
+    return changed
+
+
+def start_prefetch(client, store: ScheduleStore, days: int = 7, start: Optional[datetime] = None) -> threading.Thread:
+    """后台线程预取，不阻塞启动"""
+    t = threading.Thread(target=prefetch, args=(client, store, days, start), name="schedule-prefetch", daemon=True)
+    t.start()
+    return t
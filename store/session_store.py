@@ -0,0 +1,63 @@
+# auto_sign_backend/store/session_store.py
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from auto_sign_backend.utils.atomic_io import atomic_write_json
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    登录态磁盘缓存：按 phone + base_url 保存 sessionId/userId，超过 ttl 视为失效。
+    文件里只有会话信息，不保存密码。
+    """
+
+    def __init__(self, path: str, ttl_sec: int = 12 * 3600):
+        self.path = path
+        self.ttl_sec = ttl_sec
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(phone: str, base_url: str) -> str:
+        return hashlib.sha256(f"{phone}|{base_url.rstrip('/')}".encode("utf-8")).hexdigest()[:32]
+
+    def _read_all(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning("会话缓存文件损坏，忽略: %s", e)
+            return {}
+
+    def load(self, phone: str, base_url: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._read_all().get(self.key(phone, base_url))
+        if not entry or not entry.get("session_id"):
+            return None
+        if time.time() - entry.get("saved_at", 0) > self.ttl_sec:
+            logger.info("会话缓存已过期（%.0f 小时前保存）", (time.time() - entry.get("saved_at", 0)) / 3600)
+            return None
+        return entry
+
+    def save(self, phone: str, base_url: str, session_id: str, user_id: Any) -> None:
+        with self._lock:
+            data = self._read_all()
+            now = time.time()
+            # 顺手清掉过期条目，避免文件无限增长
+            data = {k: v for k, v in data.items() if now - v.get("saved_at", 0) <= self.ttl_sec}
+            data[self.key(phone, base_url)] = {"session_id": session_id, "user_id": user_id, "saved_at": now}
+            atomic_write_json(self.path, data, mode=0o600)
+
+    def invalidate(self, phone: str, base_url: str) -> None:
+        with self._lock:
+            data = self._read_all()
+            if data.pop(self.key(phone, base_url), None) is not None:
+                atomic_write_json(self.path, data, mode=0o600)
@@ -0,0 +1,94 @@
+# auto_sign_backend/store/sign_journal.py
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from auto_sign_backend.utils.atomic_io import atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+# 状态含义：
+#   intent  已准备发送签到请求（发送前落盘）；重启后只有 intent 说明请求可能已发出，不能盲目重发
+#   done    服务端返回成功
+#   failed  请求失败或服务端拒绝，窗口未关时可以重试
+#   missed  窗口结束仍未签到
+INTENT, DONE, FAILED, MISSED = "intent", "done", "failed", "missed"
+
+
+class SignJournal:
+    """
+    只追加的签到日志（JSONL），按 (日期, courseSchedId) 记录状态变化，每条写入后 fsync。
+    启动时顺序重放一遍（O(条目数)）得到每门课的最后状态，重启后不会重复签到
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._state: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.replay()
+        d = os.path.dirname(os.path.abspath(path))
+        os.makedirs(d, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+        if self._fh.tell() and not self._ends_with_newline():
+            # 截断的半行后面补换行，免得下一条记录和它粘在一起
+            self._fh.write("\n")
+            self._fh.flush()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def replay(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        state = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                for lineno, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        e = json.loads(line)
+                        state[(e["date"], str(e["id"]))] = e
+                    except Exception:
+                        # 崩溃时最后一行可能只写了一半，跳过即可
+                        logger.warning("签到日志第 %d 行损坏，已跳过", lineno)
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self._state = state
+        return state
+
+    def record(self, date_str: str, sched_id: Any, state: str, **extra) -> None:
+        e = {"date": date_str, "id": str(sched_id), "state": state, "t": time.time(), **extra}
+        line = json.dumps(e, ensure_ascii=False, default=str) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+            self._state[(date_str, str(sched_id))] = e
+
+    def state(self, date_str: str, sched_id: Any) -> Optional[str]:
+        with self._lock:
+            e = self._state.get((date_str, str(sched_id)))
+        return e["state"] if e else None
+
+    def entries_for(self, date_str: str) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {k[1]: e for k, e in self._state.items() if k[0] == date_str}
+
+    def compact(self, keep_from: str) -> None:
+        """重写日志：每门课只保留最后状态，并丢掉 keep_from 之前的日期"""
+        with self._lock:
+            keep = [e for (d, _), e in sorted(self._state.items()) if d >= keep_from]
+            atomic_write_text(self.path, "".join(json.dumps(e, ensure_ascii=False, default=str) + "\n" for e in keep))
+            self._fh.close()
+            self._fh = open(self.path, "a", encoding="utf-8")
+            self._state = {(e["date"], e["id"]): e for e in keep}
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
@@ -0,0 +1,66 @@
+# auto_sign_backend/stub/fake_client.py
+# 进程内的离线 IClassClient 替身：不走网络，时间取自注入的时钟，供虚拟时钟模拟使用
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from auto_sign_backend.stub import fixtures
+from auto_sign_backend.utils.clock import Clock
+
+
+class FakeIClassClient:
+    """接口与 IClassClient 中 run_auto_sign 用到的部分一致，签到请求只记录不发送"""
+
+    def __init__(self, clock: Clock, courses: List[Dict[str, Any]], before_min: int = 5, after_min: int = 30,
+                 revisions: Optional[List[Tuple[datetime, List[Dict[str, Any]]]]] = None):
+        self.clock = clock
+        self.courses = courses
+        # 课表变更：[(生效时刻, 新课表)]，按时间排序；get_course_sched 返回当前时刻已生效的最新版本
+        self.revisions = revisions or []
+        self.before_min = before_min
+        self.after_min = after_min
+        self.session_id = None
+        self.user_id = None
+        self.last_sign_reused = True
+        self.signs: List[Dict[str, Any]] = []      # {"t": datetime, "payload": {...}}
+        self._lock = threading.Lock()
+
+    def login(self, phone: str, password: str) -> Dict[str, Any]:
+        res = fixtures.LOGIN_OK["result"]
+        self.session_id, self.user_id = res["sessionId"], res["id"]
+        return fixtures.LOGIN_OK
+
+    ensure_login = login
+
+    def current_courses(self) -> List[Dict[str, Any]]:
+        now = self.clock.now()
+        courses = self.courses
+        for when, revised in self.revisions:
+            if when <= now:
+                courses = revised
+        return courses
+
+    def get_course_sched(self, date_str: str) -> Dict[str, Any]:
+        return fixtures.course_sched([c for c in self.current_courses()
+                                      if c["classBeginTime"][:10].replace("-", "") == date_str])
+
+    def get_stu_sign_time(self, date_str: str) -> Dict[str, Any]:
+        with self._lock:
+            return fixtures.stu_sign_time([s["payload"].get("courseSchedId") for s in self.signs])
+
+    def get_qxkt_sign_time(self) -> Dict[str, Any]:
+        return {"result": [{"before_minute": str(self.before_min), "after_minute": str(self.after_min)}]}
+
+    def get_socket_info(self, refresh: bool = False) -> Dict[str, Any]:
+        return fixtures.SOCKET_INFO
+
+    def cached_socket_info(self) -> Optional[Dict[str, Any]]:
+        return fixtures.SOCKET_INFO
+
+    def prewarm(self, url: str, timeout: Optional[float] = None, on_date=None) -> bool:
+        return True
+
+    def send_sign(self, sign_url: str, payload: dict, deadline: Optional[datetime] = None) -> Dict[str, Any]:
+        with self._lock:
+            self.signs.append({"t": self.clock.now(), "payload": dict(payload)})
+        return fixtures.SIGN_OK
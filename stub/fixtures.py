@@ -0,0 +1,88 @@
+# auto_sign_backend/stub/fixtures.py
+# 录制自真实 iClass 接口的响应（已脱敏），课程时间按调用时传入的日期/时刻重新生成
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+TIME_FMT = "%Y-%m-%d %H:%M:%S"
+
+LOGIN_OK = {
+    "STATUS": "0",
+    "result": {
+        "id": "8a9e7c1d5f3b4e2a9c0d1e2f3a4b5c6d",
+        "sessionId": "STUB-SESSION-0000",
+        "userName": "测试学生",
+        "phone": "25375093",
+        "userLevel": "1",
+    },
+}
+
+LOGIN_FAILED = {"STATUS": "1", "ERRCODE": "100", "ERRMSG": "密码错误!"}
+
+QXKT_SIGN_TIME = {"result": [{"before_minute": "5", "after_minute": "30"}]}
+
+SOCKET_INFO = {
+    "STATUS": "0",
+    "result": {
+        "classroomLongitude": "116.347312",
+        "classroomLatitude": "39.981456",
+        "classroomName": "主M201",
+    },
+}
+
+SIGN_OK = {"STATUS": "0", "ERRMSG": "签到成功", "result": {"stuSignStatus": "1"}}
+
+NON_JSON_BODY = "\r\n<html><head><title>502 Bad Gateway</title></head><body>nginx</body></html>"
+
+_COURSE_TEMPLATE = {
+    "courseName": "高等数学（上）",
+    "classroomName": "主M201",
+    "classroomLongitude": "116.347312",
+    "classroomLatitude": "null",
+    "teacherName": "张老师",
+    "signStatus": "0",
+}
+
+DEFAULT_DAY = [("08:00", "09:35", "高等数学（上）"), ("09:50", "11:25", "大学物理"),
+               ("14:00", "15:35", "程序设计基础"), ("15:50", "17:25", "程序设计基础")]
+
+
+def make_course(sched_id: str, begin: datetime, end: datetime, name: Optional[str] = None) -> Dict[str, Any]:
+    c = dict(_COURSE_TEMPLATE)
+    c.update({
+        "id": sched_id,
+        "courseSchedId": sched_id,
+        "classBeginTime": begin.strftime(TIME_FMT),
+        "classEndTime": end.strftime(TIME_FMT),
+    })
+    if name:
+        c["courseName"] = name
+    return c
+
+
+def course_sched(courses: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {"STATUS": "0", "result": courses}
+
+
+def day_courses(day: datetime, slots: List[Tuple[str, str, str]] = DEFAULT_DAY) -> List[Dict[str, Any]]:
+    """按 (开始 HH:MM, 结束 HH:MM, 课程名) 生成某天的课程列表"""
+    out = []
+    for i, (b, e, name) in enumerate(slots, 1):
+        bh, bm = map(int, b.split(":"))
+        eh, em = map(int, e.split(":"))
+        begin = day.replace(hour=bh, minute=bm, second=0, microsecond=0)
+        end = day.replace(hour=eh, minute=em, second=0, microsecond=0)
+        out.append(make_course(f"{day:%Y%m%d}{i:02d}", begin, end, name))
+    return out
+
+
+def courses_opening_in(seconds: float, before_min: int = 5, count: int = 1, gap_sec: float = 0,
+                       length_min: int = 95, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    """生成签到窗口在 seconds 秒后打开的课程（供基准测试使用），连堂课间隔 gap_sec 秒"""
+    base = (now or datetime.now()).replace(microsecond=0) + timedelta(seconds=int(seconds) + 1, minutes=before_min)
+    return [make_course(f"bench{i:02d}", base + timedelta(seconds=gap_sec * i),
+                        base + timedelta(seconds=gap_sec * i, minutes=length_min), f"基准课程{i}")
+            for i in range(count)]
+
+
+def stu_sign_time(signed_ids: List[str]) -> Dict[str, Any]:
+    return {"STATUS": "0", "result": [{"courseSchedId": sid, "stuSignStatus": "1"} for sid in signed_ids]}
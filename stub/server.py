@@ -0,0 +1,218 @@
+# auto_sign_backend/stub/server.py
+# 本地 iClass 替身服务：用录制的响应离线跑 run_auto_sign，可按接口注入延迟 / 错误 / 非 JSON / 连接重置
+import json
+import time
+import socket
+import random
+import struct
+import logging
+import threading
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit, parse_qs
+
+from auto_sign_backend.stub import fixtures
+
+logger = logging.getLogger(__name__)
+
+# 路径 -> 接口名（与 IClassClient 指标里的 endpoint 一致）
+ROUTES = {
+    ("POST", "/app/user/login.action"): "login",
+    ("GET", "/app/course/get_stu_course_sched.action"): "get_course_sched",
+    ("GET", "/app/common/get_stu_sign_time.action"): "get_stu_sign_time",
+    ("GET", "/ve/webservices/app_qxkt.shtml"): "get_qxkt_sign_time",
+    ("GET", "/app/service/get_socket_info.action"): "get_socket_info",
+    ("POST", "/app/course/stu_auto_sign.action"): "stu_auto_sign",
+}
+
+
+@dataclass
+class Fault:
+    """单个接口的故障注入参数，各 rate 为 0~1 的概率"""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0      # 返回 503
+    non_json_rate: float = 0.0   # 返回 200 + HTML
+    reset_rate: float = 0.0      # 不回包直接 RST
+
+
+PROFILES: Dict[str, Dict[str, Fault]] = {
+    "clean": {},
+    "slow": {"*": Fault(latency_ms=400, jitter_ms=200)},
+    "flaky": {"*": Fault(latency_ms=50, error_rate=0.3)},
+    "non_json_sched": {"get_course_sched": Fault(non_json_rate=1.0)},
+    "resets": {"*": Fault(latency_ms=20, reset_rate=0.3)},
+    "slow_sign": {"stu_auto_sign": Fault(latency_ms=1500, jitter_ms=500)},
+}
+
+
+class StubState:
+    """服务端状态：课程表、故障配置、收到的签到请求记录"""
+
+    def __init__(self, courses: Optional[List[Dict[str, Any]]] = None, faults: Optional[Dict[str, Fault]] = None,
+                 seed: Optional[int] = None, clock_skew: float = 0.0):
+        self.courses = courses if courses is not None else []
+        self.clock_skew = clock_skew                # 服务器时钟比本机快多少秒（Date 头和签到记录都按它）
+        self.faults = faults or {}
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.signs: List[Dict[str, Any]] = []      # {"t": 服务器时间 epoch, "payload": {...}}
+        self.hits: Dict[str, int] = {}
+
+    def time(self) -> float:
+        return time.time() + self.clock_skew
+
+    def fault_for(self, endpoint: str) -> Fault:
+        return self.faults.get(endpoint) or self.faults.get("*") or Fault()
+
+    def roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self.lock:
+            return self.rng.random() < rate
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "Apache-Coyote/1.1"
+    # 响应头和响应体分两次写，不关 Nagle 会被客户端延迟 ACK 拖慢 40ms，污染基准结果
+    disable_nagle_algorithm = True
+    state: StubState = None
+
+    def date_time_string(self, timestamp=None):
+        return super().date_time_string(self.state.time() if timestamp is None else timestamp)
+
+    def log_message(self, fmt, *args):
+        logger.debug("stub %s", fmt % args)
+
+    def _send(self, code: int, body: str, ctype: str = "application/json;charset=UTF-8"):
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(data)
+
+    def _reset(self):
+        # SO_LINGER=0 后关闭，客户端会收到 RST（Connection reset by peer）
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack("ii", 1, 0))
+        self.connection.close()
+        self.close_connection = True
+
+    def _dispatch(self):
+        parts = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        form = {k: v[0] for k, v in parse_qs(self.rfile.read(length).decode("utf-8")).items()} if length else {}
+
+        endpoint = ROUTES.get((self.command, parts.path))
+        if endpoint is None:
+            self._send(404 if self.command != "HEAD" else 200, "")
+            return
+
+        st = self.state
+        with st.lock:
+            st.hits[endpoint] = st.hits.get(endpoint, 0) + 1
+        fault = st.fault_for(endpoint)
+        delay = fault.latency_ms + (st.rng.uniform(0, fault.jitter_ms) if fault.jitter_ms else 0)
+        if delay:
+            time.sleep(delay / 1000)
+        if st.roll(fault.reset_rate):
+            self._reset()
+            return
+        if st.roll(fault.error_rate):
+            self._send(503, "<html><body>Service Unavailable</body></html>", "text/html")
+            return
+        if st.roll(fault.non_json_rate):
+            self._send(200, fixtures.NON_JSON_BODY, "text/html")
+            return
+        self._send(200, json.dumps(self._respond(endpoint, query, form), ensure_ascii=False))
+
+    def _respond(self, endpoint: str, query: Dict[str, str], form: Dict[str, str]) -> Dict[str, Any]:
+        st = self.state
+        if endpoint == "login":
+            return fixtures.LOGIN_OK if form.get("password") else fixtures.LOGIN_FAILED
+        if endpoint == "get_course_sched":
+            day = query.get("dateStr", "")
+            return fixtures.course_sched([c for c in st.courses
+                                          if c["classBeginTime"][:10].replace("-", "") == day])
+        if endpoint == "get_stu_sign_time":
+            with st.lock:
+                return fixtures.stu_sign_time([s["payload"].get("courseSchedId") for s in st.signs])
+        if endpoint == "get_qxkt_sign_time":
+            return fixtures.QXKT_SIGN_TIME
+        if endpoint == "get_socket_info":
+            return fixtures.SOCKET_INFO
+        if endpoint == "stu_auto_sign":
+            with st.lock:
+                st.signs.append({"t": st.time(), "payload": form})
+            return fixtures.SIGN_OK
+        return {}
+
+    do_GET = do_POST = do_HEAD = _dispatch
+
+
+class StubServer:
+    """
+    在后台线程启动替身服务：
+        with StubServer(courses=..., faults=PROFILES["flaky"]) as srv:
+            cfg["base_url"] = srv.base_url
+    """
+
+    def __init__(self, courses: Optional[List[Dict[str, Any]]] = None, faults: Optional[Dict[str, Fault]] = None,
+                 host: str = "127.0.0.1", port: int = 0, seed: Optional[int] = None, clock_skew: float = 0.0):
+        self.state = StubState(courses, faults, seed, clock_skew)
+        handler = type("StubHandler", (_Handler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def sign_url(self) -> str:
+        return f"{self.base_url}/app/course/stu_auto_sign.action"
+
+    def start(self) -> "StubServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="iclass-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+
+def main():
+    import argparse
+    from datetime import datetime
+
+    ap = argparse.ArgumentParser(description="本地 iClass 替身服务")
+    ap.add_argument("--port", type=int, default=8181)
+    ap.add_argument("--profile", choices=sorted(PROFILES), default="clean")
+    ap.add_argument("--skew", type=float, default=0.0, help="服务器时钟比本机快多少秒")
+    args = ap.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+    srv = StubServer(fixtures.day_courses(datetime.now()), PROFILES[args.profile], port=args.port,
+                     clock_skew=args.skew)
+    logger.info("iClass 替身服务已启动: %s（故障配置 %s）", srv.base_url, args.profile)
+    try:
+        srv.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# auto_sign_backend/tests/conftest.py
+# 仓库目录本身就是 auto_sign_backend 包：把它的上一级放进 sys.path，测试里按 auto_sign_backend.xxx 导入
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
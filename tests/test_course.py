@@ -0,0 +1,74 @@
+# auto_sign_backend/tests/test_course.py
+# 课程表字段处理（logic/course.py）：经纬度缺省、时间解析、签到窗口换算、服务端错误响应
+from datetime import datetime
+
+from auto_sign_backend.logic.course import Course, parse_courses, sched_ok
+
+DEFAULT_LON, DEFAULT_LAT = 116.397451, 39.909187
+
+
+def row(sched_id="1", begin="2025-09-01 08:00:00", end="2025-09-01 09:35:00", **extra):
+    d = {"courseSchedId": sched_id, "courseName": "高等数学", "classroomName": "J1-101",
+         "classBeginTime": begin, "classEndTime": end}
+    d.update(extra)
+    return d
+
+
+def sched(*rows):
+    return {"STATUS": "0", "result": list(rows)}
+
+
+def parse(s):
+    return parse_courses(s, 5, 30, DEFAULT_LON, DEFAULT_LAT)
+
+
+def test_window_math():
+    (c,) = parse(sched(row()))
+    assert c.begin == datetime(2025, 9, 1, 8, 0)
+    assert c.end == datetime(2025, 9, 1, 9, 35)
+    assert c.sign_begin == datetime(2025, 9, 1, 7, 55)
+    assert c.sign_end == datetime(2025, 9, 1, 10, 5)
+    assert c.is_open(datetime(2025, 9, 1, 7, 55)) and c.is_open(datetime(2025, 9, 1, 10, 5))
+    assert not c.is_open(datetime(2025, 9, 1, 7, 54, 59))
+
+
+def test_coordinates_from_row():
+    (c,) = parse(sched(row(classroomLongitude="116.3", classroomLatitude=39.98)))
+    assert (c.longitude, c.latitude) == (116.3, 39.98)
+
+
+def test_missing_coordinates_fall_back_to_defaults():
+    rows = [row("1"), row("2", classroomLongitude=None, classroomLatitude="null"),
+            row("3", classroomLongitude="", classroomLatitude="abc")]
+    for c in parse(sched(*rows)):
+        assert (c.longitude, c.latitude) == (DEFAULT_LON, DEFAULT_LAT)
+
+
+def test_missing_coordinates_without_defaults():
+    (c,) = parse_courses(sched(row()), 5, 30)
+    assert c.longitude is None and c.latitude is None
+
+
+def test_bad_or_missing_timestamps_are_dropped():
+    rows = [row("ok"), row("no-begin", begin=None), row("no-end", end=""),
+            row("bad", begin="2025/09/01 8点"), "not a dict"]
+    assert [c.sched_id for c in parse(sched(*rows))] == ["ok"]
+    assert Course.from_api(row(begin="garbage"), 5, 30) is None
+
+
+def test_sorted_by_sign_begin_and_id_fallback():
+    rows = [row("b", begin="2025-09-01 14:00:00", end="2025-09-01 15:35:00"),
+            {**row(begin="2025-09-01 08:00:00"), "courseSchedId": None, "id": 7}]
+    assert [c.sched_id for c in parse(sched(*rows))] == ["7", "b"]
+
+
+def test_error_response_is_not_an_empty_day():
+    # 服务端报错（系统繁忙 / 维护）不能当成"今天没课"：刷新和预取都靠 sched_ok 区分
+    busy = {"STATUS": "1", "ERRMSG": "系统繁忙"}
+    assert parse(busy) == []
+    assert not sched_ok(busy)
+    assert not sched_ok({"STATUS": "0", "result": {"oops": 1}})
+    assert not sched_ok({"result": []})
+    assert not sched_ok(None)
+    assert sched_ok(sched())
+    assert sched_ok({"STATUS": 0, "result": [row()]})
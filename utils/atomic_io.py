@@ -0,0 +1,32 @@
+# auto_sign_backend/utils/atomic_io.py
+import os
+import json
+import tempfile
+from typing import Any
+
+
+def atomic_write_text(path: str, text: str, mode: int = 0o644) -> None:
+    """
+    原子写文件：先写同目录临时文件并 fsync，再 os.replace 覆盖，
+    进程中途崩溃也不会留下半截文件
+    """
+    d = os.path.dirname(os.path.abspath(path))
+    os.makedirs(d, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".tmp-", dir=d)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except Exception:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def atomic_write_json(path: str, data: Any, mode: int = 0o644) -> None:
+    atomic_write_text(path, json.dumps(data, ensure_ascii=False), mode)
@@ -0,0 +1,85 @@
+# auto_sign_backend/utils/clock.py
+import time
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+
+class Clock:
+    """
+    时间来源抽象：run.py / 调度器 / 重试逻辑都通过它取时间和睡眠，
+    换成 SimulatedClock 就能在毫秒内跑完一整天的课表
+    """
+
+    def now(self) -> datetime:
+        raise NotImplementedError
+
+    def time(self) -> float:
+        raise NotImplementedError
+
+    def sleep(self, seconds: float) -> None:
+        raise NotImplementedError
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float] = None) -> None:
+        """在已持有的条件变量上等待，最多 timeout 秒（None 表示直到被 notify）"""
+        raise NotImplementedError
+
+
+class SystemClock(Clock):
+    def now(self) -> datetime:
+        return datetime.now()
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float] = None) -> None:
+        cond.wait(timeout)
+
+
+class SimulatedClock(Clock):
+    """
+    虚拟时钟：sleep / 带超时的 wait 不真正等待，直接把时间拨到目标时刻。
+    只适合单线程驱动的模拟（调度器就是唯一推进时间的线程）
+    """
+
+    def __init__(self, start: datetime):
+        self._now = start
+        self._lock = threading.Lock()
+        self.advanced_sec = 0.0
+
+    def now(self) -> datetime:
+        with self._lock:
+            return self._now
+
+    def time(self) -> float:
+        return self.now().timestamp()
+
+    def advance(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._lock:
+            self._now += timedelta(seconds=seconds)
+            self.advanced_sec += seconds
+
+    def set(self, when: datetime) -> None:
+        with self._lock:
+            if when > self._now:
+                self.advanced_sec += (when - self._now).total_seconds()
+                self._now = when
+
+    def sleep(self, seconds: float) -> None:
+        self.advance(seconds)
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float] = None) -> None:
+        if timeout is None:
+            # 没有定时事件可推进，只能等别的线程 notify
+            cond.wait()
+        else:
+            self.advance(timeout)
+
+
+REAL_CLOCK = SystemClock()
@@ -1,25 +1,233 @@
 # auto_sign_backend/utils/http_retry.py
 import time
+import random
 import logging
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+import threading
+from typing import Callable, List, Optional, Union
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
 
 logger = logging.getLogger(__name__)
 
-def request_with_retries(session: requests.Session, method: str, url: str, max_retries: int = 3, backoff: int = 2, **kwargs):
+RETRY = "retry"
+FATAL = "fatal"
+
+# ---------------- 连接耗时采集 ----------------
+# urllib3 在发请求的线程里建连接，用线程局部变量累计本线程的建连耗时
+_conn_timing = threading.local()
+
+
+class _TimedConnectMixin:
+    def connect(self):
+        t0 = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            _conn_timing.connect_ms = getattr(_conn_timing, "connect_ms", 0.0) + (time.perf_counter() - t0) * 1000
+
+
+class _TimedHTTPConnection(_TimedConnectMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectMixin, HTTPSConnection):
+    pass
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+class TimingAdapter(HTTPAdapter):
+    """挂到 requests.Session 上后，新建连接（TCP + TLS）的耗时会记入 RequestStats.connect_ms"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _TimedHTTPConnectionPool, "https": _TimedHTTPSConnectionPool}
+
+
+class RequestStats:
+    """一次 request_with_retries 调用的统计，交给请求钩子"""
+    __slots__ = ("endpoint", "method", "url", "attempts", "connect_ms", "ttfb_ms", "total_ms",
+                 "outcome", "status_code", "response")
+
+    def __init__(self, endpoint: Optional[str], method: str, url: str):
+        self.endpoint = endpoint
+        self.method = method
+        self.url = url
+        self.attempts = 0
+        self.connect_ms = 0.0
+        self.ttfb_ms = None
+        self.total_ms = 0.0
+        self.outcome = "ok"
+        self.status_code = None
+        self.response = None
+
+
+_request_hooks: List[Callable[[RequestStats], None]] = []
+
+
+def add_request_hook(hook: Callable[[RequestStats], None]) -> None:
+    """注册全局请求钩子；每次 request_with_retries 结束（成功或失败）都会调用"""
+    if hook not in _request_hooks:
+        _request_hooks.append(hook)
+
+
+def remove_request_hook(hook: Callable[[RequestStats], None]) -> None:
+    if hook in _request_hooks:
+        _request_hooks.remove(hook)
+
+
+def _outcome(exc: Exception) -> str:
+    resp = getattr(exc, "response", None)
+    if resp is not None:
+        return f"http_{resp.status_code // 100}xx"
+    if isinstance(exc, requests.Timeout):
+        return "timeout"
+    if isinstance(exc, requests.ConnectionError):
+        return "conn_error"
+    return "error"
+
+
+def _emit(stats: RequestStats, t0: float) -> None:
+    stats.total_ms = (time.perf_counter() - t0) * 1000
+    for hook in _request_hooks:
+        try:
+            hook(stats)
+        except Exception as e:
+            logger.debug("请求钩子异常: %s", e)
+
+
+class RetryPolicy:
+    """
+    重试策略：指数退避 + 抖动，按错误类型决定是否重试，支持 Retry-After。
+    - 连接失败 / 连接超时 / 读超时 / 429 / 5xx：可重试
+    - 其余 4xx、SSL 证书错误、URL 错误等：立即失败，重试没有意义
+    """
+
+    def __init__(self, max_retries: int = 3, base_backoff: float = 0.5, max_backoff: float = 8.0,
+                 jitter: float = 0.5, retry_statuses=(429, 500, 502, 503, 504), max_retry_after: float = 30.0):
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = frozenset(retry_statuses)
+        self.max_retry_after = max_retry_after
+
+    def classify(self, exc: Exception) -> str:
+        if isinstance(exc, requests.HTTPError):
+            resp = exc.response
+            return RETRY if resp is not None and resp.status_code in self.retry_statuses else FATAL
+        if isinstance(exc, requests.exceptions.SSLError):
+            return FATAL
+        if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+            return RETRY
+        if isinstance(exc, requests.RequestException):
+            # InvalidURL / MissingSchema 等
+            return FATAL
+        return RETRY
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次失败后的等待秒数：base * 2^(attempt-1)，上限 max_backoff，再乘 [1-jitter, 1] 的随机系数"""
+        delay = min(self.max_backoff, self.base_backoff * (2 ** (attempt - 1)))
+        return delay * (1 - self.jitter * random.random())
+
+    def retry_after(self, exc: Exception) -> Optional[float]:
+        resp = getattr(exc, "response", None)
+        value = resp.headers.get("Retry-After") if resp is not None else None
+        if not value:
+            return None
+        try:
+            sec = float(value)
+        except ValueError:
+            try:
+                sec = parsedate_to_datetime(value).timestamp() - time.time()
+            except Exception:
+                return None
+        return max(0.0, min(sec, self.max_retry_after))
+
+
+DEFAULT_POLICY = RetryPolicy()
+
+
+def _deadline_ts(deadline: Union[None, float, datetime]) -> Optional[float]:
+    if deadline is None:
+        return None
+    return deadline.timestamp() if isinstance(deadline, datetime) else float(deadline)
+
+
+def request_with_retries(session: requests.Session, method: str, url: str, max_retries: Optional[int] = None,
+                         policy: Optional[RetryPolicy] = None, deadline: Union[None, float, datetime] = None,
+                         endpoint: Optional[str] = None, clock: Clock = REAL_CLOCK, **kwargs):
     """
     封装 requests 的重试逻辑，session 可以是 requests.Session()。
     kwargs 会传给 session.request，如 data/json/headers/timeout/verify 等
+    deadline 为绝对截止时间（datetime 或 epoch 秒）：单次请求的 timeout 会被截到剩余预算内，
+    预算不够下一次退避时直接放弃，保证重试不会拖过截止时间
+    endpoint 为指标里的接口名，结束时连同尝试次数/耗时/结果交给已注册的请求钩子
     """
+    stats = RequestStats(endpoint, method, url)
+    t0 = time.perf_counter()
+    policy = policy or DEFAULT_POLICY
+    max_retries = max_retries or policy.max_retries
+    deadline_ts = _deadline_ts(deadline)
+    base_timeout = kwargs.get("timeout")
     attempt = 0
+    last_exc = None
     while attempt < max_retries:
+        if deadline_ts is not None:
+            remaining = deadline_ts - clock.time()
+            if remaining <= 0:
+                break
+            kwargs["timeout"] = min(base_timeout, remaining) if base_timeout else remaining
+        _conn_timing.connect_ms = 0.0
+        stats.attempts += 1
+        resp = None
         try:
             resp = session.request(method, url, **kwargs)
+            stats.connect_ms += _conn_timing.connect_ms
+            stats.ttfb_ms = resp.elapsed.total_seconds() * 1000
+            stats.status_code = resp.status_code
+            stats.response = resp
             # 如果希望查看原始返回以便调试，可以在这里打印 resp.status_code / resp.text 的前段
             resp.raise_for_status()
+            stats.outcome = "ok"
+            _emit(stats, t0)
             return resp
         except Exception as e:
+            if resp is None:
+                stats.connect_ms += _conn_timing.connect_ms
+            stats.outcome = _outcome(e)
+            last_exc = e
             attempt += 1
             logger.warning("请求失败: %s %s 错误: %s 尝试 %d/%d", method, url, e, attempt, max_retries)
-            time.sleep(backoff * attempt)
+            if policy.classify(e) == FATAL:
+                _emit(stats, t0)
+                raise RuntimeError(f"请求失败（不可重试）: {method} {url}") from e
+            if attempt >= max_retries:
+                break
+            delay = policy.retry_after(e)
+            if delay is None:
+                delay = policy.backoff(attempt)
+            if deadline_ts is not None and clock.time() + delay >= deadline_ts:
+                logger.warning("剩余时间不足以再次重试，放弃: %s %s", method, url)
+                break
+            logger.info("%.2f 秒后重试（第 %d 次尝试）: %s %s", delay, attempt + 1, method, url)
+            clock.sleep(delay)
+    if last_exc is None:
+        stats.outcome = "deadline"
+        _emit(stats, t0)
+        raise RuntimeError(f"已过截止时间，未发送请求: {method} {url}")
+    _emit(stats, t0)
     # 最终失败，抛出异常并把最后一次异常信息返回
-    raise RuntimeError(f"请求多次失败: {method} {url}")
+    raise RuntimeError(f"请求多次失败: {method} {url}") from last_exc
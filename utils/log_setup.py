@@ -0,0 +1,94 @@
+# auto_sign_backend/utils/log_setup.py
+import sys
+import copy
+import json
+import queue
+import atexit
+import logging
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# JSON 行格式里固定输出的结构化字段，通过 logger.info(..., extra={...}) 传入
+STRUCTURED_FIELDS = ("event", "courseSchedId", "latency_ms")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonLineFormatter(logging.Formatter):
+    """每条日志一行 JSON：ts/level/logger/msg + 固定的结构化字段（缺省为 null）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for f in STRUCTURED_FIELDS:
+            out[f] = getattr(record, f, None)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """
+    调用线程里只做最少的事：合并 msg % args、把异常栈转成文本（参数和异常对象之后可能变化），
+    真正的格式化和写文件交给 QueueListener 的后台线程
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging(log_file: Optional[str] = None, json_format: bool = False, max_bytes: int = 5 * 1024 * 1024,
+                  backup_count: int = 5, level: int = logging.INFO) -> QueueListener:
+    """
+    配置根 logger：业务线程只往内存队列里放记录，控制台和文件（按大小轮转，显式 UTF-8）
+    由后台线程写出。重复调用会先停掉旧的 listener，不会出现重复日志
+    """
+    global _listener
+    shutdown_logging()
+
+    fmt = JsonLineFormatter() if json_format else logging.Formatter(TEXT_FORMAT)
+    handlers = []
+    console = logging.StreamHandler(sys.stderr)
+    console.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers.append(console)
+    if log_file:
+        fh = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+        fh.setFormatter(fmt)
+        handlers.append(fh)
+
+    q = queue.SimpleQueue()
+    root = logging.getLogger()
+    for h in list(root.handlers):
+        root.removeHandler(h)
+    root.addHandler(_DeferredQueueHandler(q))
+    root.setLevel(level)
+
+    _listener = QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """停止后台线程并把队列里剩下的日志写完"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
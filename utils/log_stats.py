@@ -0,0 +1,303 @@
+# auto_sign_backend/utils/log_stats.py
+# auto_sign.log 的流式统计：逐行读取（含轮转的 .1/.2 和 .gz），按课程把"进入签到窗口 / 发送签到请求 /
+# 签到响应"串起来，统计相对窗口打开的延迟分位数，以及各接口的重试次数和失败原因
+import os
+import re
+import math
+import glob
+import gzip
+import json
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_LINE = re.compile(r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) \[(\w+)\] (.*)$")
+_WINDOW = re.compile(r"^课程 \[?(.+?)\]? 签到窗口(?:: |更新为 )(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d) ~ (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)")
+_OPEN = re.compile(r"^检测到课程 \[(.+)\] 已?进入签到窗口")
+_SEND = re.compile(r"^发送签到请求(?:到 (\S+))?")
+_HTTP = re.compile(r"^签到响应 HTTP (\S+?)(?:（|$)")
+_RESULT = re.compile(r"^(?:课程 \[(.+)\] )?签到返回(?: JSON)?: (.*)$")
+_SIGN_ERROR = re.compile(r"^签到(?:请求)?异常: (.*)$")
+_DONE = re.compile(r"^课程 \[(.+)\] 签到完成")
+_RETRY = re.compile(r"^请求失败: (\S+) (\S+) 错误: (.*) 尝试 (\d+)/(\d+)$")
+_GAVE_UP = re.compile(r"^剩余时间不足以再次重试，放弃: (\S+) (\S+)")
+_RETRYING = re.compile(r"^[\d.]+ 秒后重试（第 (\d+) 次尝试）: (\S+) (\S+)$")
+
+
+@dataclass(slots=True)
+class Record:
+    ts: datetime
+    level: str
+    msg: str
+
+
+@dataclass(slots=True)
+class SignAttempt:
+    course: str
+    opened: datetime
+    window_begin: Optional[datetime] = None
+    sent: Optional[datetime] = None
+    responded: Optional[datetime] = None
+    http: Optional[str] = None
+    ok: Optional[bool] = None          # None：没有发请求（dry_run / 中途退出）
+    retries: int = 0
+
+    def since_open(self, t: Optional[datetime]) -> Optional[float]:
+        """t 相对签到窗口打开的毫秒数；窗口未知时为 None"""
+        if t is None or self.window_begin is None:
+            return None
+        return (t - self.window_begin).total_seconds() * 1000
+
+
+@dataclass
+class EndpointStats:
+    requests_failed: int = 0           # "请求失败" 行数，每行是一次失败的尝试
+    retries: int = 0                   # 失败后确实又发了一次（不可重试的 4xx 等不算）
+    exhausted: int = 0                 # 重试次数用完
+    gave_up: int = 0                   # 截止时间不够，提前放弃
+    errors: Counter = field(default_factory=Counter)
+
+
+# ---------------- 生成器流水线 ----------------
+
+def expand_paths(paths: Iterable[str]) -> Iterator[str]:
+    """每个日志文件连同它轮转出来的 .N / .N.gz 一起，按从旧到新的顺序给出"""
+    def rank(p: str) -> int:
+        m = re.search(r"\.(\d+)(?:\.gz)?$", p)
+        return int(m.group(1)) if m else 0
+    seen = set()
+    for path in paths:
+        group = [p for p in glob.glob(glob.escape(path) + ".*") if re.search(r"\.\d+(?:\.gz)?$", p)]
+        if os.path.exists(path):
+            group.append(path)
+        for p in sorted(group, key=rank, reverse=True):
+            if p not in seen:
+                seen.add(p)
+                yield p
+
+
+def read_lines(paths: Iterable[str]) -> Iterator[bytes]:
+    """逐行读原始字节，.gz 透明解压；不会把整个文件读进内存"""
+    for path in paths:
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            yield from f
+
+
+def decode_lines(lines: Iterable[bytes]) -> Iterator[str]:
+    """逐行解码：先按 UTF-8，失败再按 GBK（旧版在 Windows 上写出的日志），同一文件里两种可以混着"""
+    for raw in lines:
+        try:
+            yield raw.decode("utf-8").rstrip("\r\n")
+        except UnicodeDecodeError:
+            yield raw.decode("gbk", errors="replace").rstrip("\r\n")
+
+
+def parse_records(lines: Iterable[str]) -> Iterator[Record]:
+    """文本格式和 JSON 行格式都认；异常栈等续行跳过"""
+    for line in lines:
+        m = _LINE.match(line)
+        if m:
+            ts = datetime.strptime(m.group(1), TS_FORMAT).replace(microsecond=int(m.group(2)) * 1000)
+            yield Record(ts, m.group(3), m.group(4))
+        elif line.startswith("{"):
+            try:
+                obj = json.loads(line)
+                yield Record(datetime.fromisoformat(obj["ts"]), obj.get("level", ""), obj.get("msg", ""))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+
+def _endpoint(url: str) -> str:
+    return urlsplit(url).path or url
+
+
+def _error_kind(err: str) -> str:
+    m = re.search(r"\b(\d{3}) (?:Client|Server) Error", err)
+    if m:
+        return f"http_{m.group(1)}"
+    low = err.lower()
+    if "timed out" in low or "timeout" in low:
+        return "timeout"
+    if "connection" in low or "max retries exceeded" in low:
+        return "connection"
+    return "other"
+
+
+class LogStats:
+    """把记录流折叠成签到尝试和接口统计；correlate 边消费边产出已结束的签到尝试"""
+
+    def __init__(self, since: Optional[datetime] = None, until: Optional[datetime] = None):
+        self.since, self.until = since, until
+        self.endpoints: Dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.lines = 0
+        self._windows: Dict[str, Tuple[datetime, datetime]] = {}
+        self._sign_endpoints = set()   # 从"发送签到请求到 <url>"行里认出的签到接口
+
+    def correlate(self, records: Iterable[Record]) -> Iterator[SignAttempt]:
+        """
+        签到线程池里几门课可以同时在签：带课程名的行直接归到那门课，
+        不带课程名的发送 / 响应行按窗口打开的先后归给最早一门还缺这一步的课（发送之间有间隔，顺序不会乱）。
+        一次失败只有在后面跟着"N 秒后重试"行、或同一请求的下一次尝试行（旧版日志）时才算重试，
+        而且只有签到接口的重试记到正在签的课上
+        """
+        active: Dict[str, SignAttempt] = {}
+        pending: Dict[Tuple[str, str], int] = {}     # (method, url) → 最近一次还没有下文的失败是第几次尝试
+
+        def first(pred) -> Optional[SignAttempt]:
+            return next((a for a in active.values() if pred(a)), None)
+
+        def awaiting_result() -> Optional[SignAttempt]:
+            # 旧版日志没有"发送签到请求"这一行，退而取最早一门还没有结果的
+            return first(lambda a: a.sent is not None and a.ok is None) or first(lambda a: a.ok is None)
+
+        def retried(method: str, url: str) -> None:
+            ep = _endpoint(url)
+            self.endpoints[ep].retries += 1
+            if ep in self._sign_endpoints:
+                a = first(lambda a: a.sent is not None and a.ok is None)
+                if a is not None:
+                    a.retries += 1
+
+        for r in records:
+            if (self.since and r.ts < self.since) or (self.until and r.ts >= self.until):
+                continue
+            self.lines += 1
+            msg = r.msg
+            m = _WINDOW.match(msg)
+            if m:
+                self._windows[m.group(1)] = (datetime.strptime(m.group(2), TS_FORMAT),
+                                             datetime.strptime(m.group(3), TS_FORMAT))
+                continue
+            m = _OPEN.match(msg)
+            if m:
+                name = m.group(1)
+                if name in active:
+                    yield active.pop(name)
+                w = self._windows.get(name)
+                # 窗口行可能来自另一天的运行，对不上当前时刻就不算延迟
+                begin = w[0] if w and w[0] <= r.ts <= w[1] else None
+                active[name] = SignAttempt(name, r.ts, begin)
+                continue
+            m = _RETRY.match(msg)
+            if m:
+                method, url, attempt = m.group(1), m.group(2), int(m.group(4))
+                ep = self.endpoints[_endpoint(url)]
+                ep.requests_failed += 1
+                ep.errors[_error_kind(m.group(3))] += 1
+                if pending.pop((method, url), None) == attempt - 1:
+                    retried(method, url)
+                if attempt == int(m.group(5)):
+                    ep.exhausted += 1
+                else:
+                    pending[(method, url)] = attempt
+                continue
+            m = _RETRYING.match(msg)
+            if m:
+                if pending.pop((m.group(2), m.group(3)), None) is not None:
+                    retried(m.group(2), m.group(3))
+                continue
+            m = _GAVE_UP.match(msg)
+            if m:
+                pending.pop((m.group(1), m.group(2)), None)
+                self.endpoints[_endpoint(m.group(2))].gave_up += 1
+                continue
+            if not active:
+                continue
+            m = _SEND.match(msg)
+            if m:
+                if m.group(1):
+                    self._sign_endpoints.add(_endpoint(m.group(1)))
+                a = first(lambda a: a.sent is None)
+                if a is not None:
+                    a.sent = r.ts
+                continue
+            m = _HTTP.match(msg)
+            if m:
+                a = first(lambda a: a.sent is not None and a.responded is None)
+                if a is not None:
+                    a.responded, a.http = r.ts, m.group(1)
+                continue
+            m = _RESULT.match(msg)
+            if m:
+                a = active.get(m.group(1)) if m.group(1) else awaiting_result()
+                if a is not None:
+                    a.responded = a.responded or r.ts
+                    a.ok = "'STATUS': '0'" in m.group(2) or '"STATUS": "0"' in m.group(2)
+                continue
+            if _SIGN_ERROR.match(msg):
+                a = awaiting_result()
+                if a is not None:
+                    a.ok = False
+                continue
+            m = _DONE.match(msg)
+            if m and m.group(1) in active:
+                yield active.pop(m.group(1))
+        yield from active.values()
+
+
+def percentiles(values: List[float], qs=(0.5, 0.9, 0.99)) -> Dict[str, float]:
+    """最近秩分位数；values 为空时返回空 dict"""
+    if not values:
+        return {}
+    v = sorted(values)
+    out = {f"p{round(q * 100)}": v[max(0, math.ceil(q * len(v)) - 1)] for q in qs}
+    out["max"] = v[-1]
+    return out
+
+
+def analyze(paths: Iterable[str], since: Optional[datetime] = None, until: Optional[datetime] = None,
+            rotated: bool = True) -> Dict:
+    files = list(expand_paths(paths)) if rotated else list(paths)
+    stats = LogStats(since, until)
+    lat = {"open": [], "send": [], "response": [], "rtt": []}
+    attempts = ok = failed = no_request = retries = 0
+    for a in stats.correlate(parse_records(decode_lines(read_lines(files)))):
+        attempts += 1
+        retries += a.retries
+        if a.ok is None:
+            no_request += 1
+        elif a.ok:
+            ok += 1
+        else:
+            failed += 1
+        for name, t in (("open", a.opened), ("send", a.sent), ("response", a.responded)):
+            ms = a.since_open(t)
+            if ms is not None:
+                lat[name].append(ms)
+        if a.sent and a.responded:
+            lat["rtt"].append((a.responded - a.sent).total_seconds() * 1000)
+    return {
+        "files": files, "lines": stats.lines,
+        "attempts": attempts, "ok": ok, "failed": failed, "no_request": no_request, "sign_retries": retries,
+        "latency_ms": {k: {**percentiles(v), "n": len(v)} for k, v in lat.items()},
+        "endpoints": {ep: {"retries": s.retries, "exhausted": s.exhausted, "gave_up": s.gave_up,
+                           "errors": dict(s.errors)}
+                      for ep, s in sorted(stats.endpoints.items())},
+    }
+
+
+def format_report(rep: Dict) -> str:
+    labels = {"open": "检测到窗口打开", "send": "发出签到请求", "response": "收到签到响应", "rtt": "请求往返"}
+    out = [f"读取 {len(rep['files'])} 个文件，{rep['lines']} 条日志",
+           f"签到 {rep['attempts']} 次：成功 {rep['ok']}，失败 {rep['failed']}，未发请求 {rep['no_request']}，"
+           f"签到请求重试 {rep['sign_retries']} 次",
+           "相对窗口打开的延迟（ms）:"]
+    for k, label in labels.items():
+        p = rep["latency_ms"][k]
+        if not p["n"]:
+            out.append(f"  {label}: 无数据")
+            continue
+        out.append(f"  {label}: n={p['n']} p50 {p['p50']:.0f}  p90 {p['p90']:.0f}  p99 {p['p99']:.0f}  "
+                   f"max {p['max']:.0f}")
+    if rep["endpoints"]:
+        out.append("各接口重试 / 失败:")
+        for ep, s in rep["endpoints"].items():
+            errs = "，".join(f"{k} {n}" for k, n in sorted(s["errors"].items(), key=lambda kv: -kv[1]))
+            out.append(f"  {ep}: 重试 {s['retries']}，重试用尽 {s['exhausted']}，截止前放弃 {s['gave_up']}"
+                       + (f"（{errs}）" if errs else ""))
+    return "\n".join(out)
@@ -0,0 +1,159 @@
+# auto_sign_backend/utils/metrics.py
+import bisect
+import logging
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from auto_sign_backend.utils.atomic_io import atomic_write_json, atomic_write_text
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+ATTEMPT_BUCKETS = (1, 2, 3, 5, 10)
+
+
+class Histogram:
+    """累积直方图（Prometheus 语义：le 为上界，最后一桶是 +Inf）"""
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Iterable[float]):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def copy(self) -> "Histogram":
+        h = Histogram(())
+        h.buckets, h.counts, h.sum, h.count = self.buckets, list(self.counts), self.sum, self.count
+        return h
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估算分位数，够用于粗看分布"""
+        if not self.count:
+            return None
+        target = q * self.count
+        acc = 0
+        for i, n in enumerate(self.counts):
+            acc += n
+            if acc >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, 3),
+            "buckets": {str(b): n for b, n in zip(list(self.buckets) + ["+Inf"], self.counts)},
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    进程内指标汇总：计数器 + 直方图，按 (指标名, 标签) 区分。
+    退出时导出为 Prometheus textfile 或 JSON 摘要
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Tuple], float] = {}
+        self._histograms: Dict[Tuple[str, Tuple], Histogram] = {}
+        self._help: Dict[str, str] = {}
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+            if help:
+                self._help.setdefault(name, help)
+
+    def observe(self, name: str, value: float, buckets: Iterable[float] = LATENCY_BUCKETS_MS,
+                help: str = "", **labels) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = Histogram(buckets)
+            h.observe(value)
+            if help:
+                self._help.setdefault(name, help)
+
+    def on_request(self, stats) -> None:
+        """http_retry 的请求钩子：把一次 request_with_retries 的统计记入直方图"""
+        ep = stats.endpoint or "unknown"
+        self.inc("iclass_requests_total", help="iClass 请求次数（按结果）", endpoint=ep, outcome=stats.outcome)
+        if stats.attempts > 1:
+            self.inc("iclass_request_retries_total", stats.attempts - 1, help="重试次数", endpoint=ep)
+        self.observe("iclass_request_attempts", stats.attempts, ATTEMPT_BUCKETS, help="单次调用的尝试次数", endpoint=ep)
+        self.observe("iclass_request_total_ms", stats.total_ms, help="含重试与退避的总耗时", endpoint=ep)
+        if stats.ttfb_ms is not None:
+            self.observe("iclass_request_ttfb_ms", stats.ttfb_ms, help="最后一次尝试到收到响应头的耗时", endpoint=ep)
+        if stats.connect_ms:
+            self.observe("iclass_request_connect_ms", stats.connect_ms, help="新建连接（TCP+TLS）耗时", endpoint=ep)
+
+    def snapshot(self) -> Tuple[Dict, Dict]:
+        with self._lock:
+            counters = dict(self._counters)
+            hists = {k: h.copy() for k, h in self._histograms.items()}
+        return counters, hists
+
+    def to_prometheus(self) -> str:
+        counters, hists = self.snapshot()
+        lines = []
+        seen = set()
+        for (name, labels), v in sorted(counters.items()):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_labels(labels)} {v:g}")
+        for (name, labels), h in sorted(hists.items()):
+            if name not in seen:
+                seen.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} histogram")
+            acc = 0
+            for b, n in zip(list(h.buckets) + ["+Inf"], h.counts):
+                acc += n
+                le = 'le="%s"' % b
+                lines.append(f"{name}_bucket{_labels(labels, le)} {acc}")
+            lines.append(f"{name}_sum{_labels(labels)} {h.sum:.3f}")
+            lines.append(f"{name}_count{_labels(labels)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_json(self) -> Dict[str, Any]:
+        counters, hists = self.snapshot()
+        out: Dict[str, Any] = {"counters": {}, "histograms": {}}
+        for (name, labels), v in sorted(counters.items()):
+            out["counters"].setdefault(name, []).append({"labels": dict(labels), "value": v})
+        for (name, labels), h in sorted(hists.items()):
+            out["histograms"].setdefault(name, []).append({"labels": dict(labels), **h.to_dict()})
+        return out
+
+    def dump(self, prom_file: Optional[str] = None, json_file: Optional[str] = None) -> None:
+        """写出指标文件（原子替换，node_exporter textfile collector 不会读到半截文件）"""
+        if prom_file:
+            atomic_write_text(prom_file, self.to_prometheus())
+            logger.info("指标已写入 %s", prom_file)
+        if json_file:
+            atomic_write_json(json_file, self.to_json())
+            logger.info("指标摘要已写入 %s", json_file)
+
+
+REGISTRY = MetricsRegistry()
@@ -0,0 +1,194 @@
+# auto_sign_backend/utils/notify.py
+import sys
+import json
+import time
+import queue
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 事件类型
+LOGIN_FAILED = "login_failed"
+SCHED_FAILED = "sched_failed"
+SIGN_OK = "sign_ok"
+SIGN_FAILED = "sign_failed"
+
+
+@dataclass(slots=True)
+class Notification:
+    kind: str
+    title: str
+    body: str = ""
+    key: Optional[str] = None          # 去重键，默认 kind:title
+    t: float = field(default_factory=time.time)
+    count: int = 1                     # 同一批次里合并的条数
+
+    @property
+    def dedupe_key(self) -> str:
+        return self.key or f"{self.kind}:{self.title}"
+
+
+class Sender:
+    """推送通道：send 一次发出一整批，失败抛异常，由 Notifier 负责重试"""
+
+    def send(self, batch: List[Notification]) -> None:
+        raise NotImplementedError
+
+
+def render(batch: List[Notification]) -> Dict[str, str]:
+    """一批通知合成一条消息：单条直接用它的标题，多条时标题写条数、正文逐条列出"""
+    def line(n: Notification) -> str:
+        ts = datetime.fromtimestamp(n.t).strftime("%H:%M:%S")
+        suffix = f"（×{n.count}）" if n.count > 1 else ""
+        return f"[{ts}] {n.title}{suffix}" + (f"：{n.body}" if n.body else "")
+    if len(batch) == 1:
+        return {"title": batch[0].title, "desp": line(batch[0])}
+    return {"title": f"iClass 自动签到：{len(batch)} 条通知", "desp": "\n\n".join(line(n) for n in batch)}
+
+
+class WebhookSender(Sender):
+    """POST 表单 title/desp 到 url；url 中的 {key} 替换为 PUSH_KEY（默认 Server 酱格式）"""
+
+    def __init__(self, url: str, push_key: Optional[str] = None, timeout: float = 10):
+        import requests
+        self.url = url.format(key=push_key or "")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def send(self, batch: List[Notification]) -> None:
+        resp = self.session.post(self.url, data=render(batch), timeout=self.timeout)
+        resp.raise_for_status()
+
+
+class FileSender(Sender):
+    """每条通知一行 JSON 追加到本地文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def send(self, batch: List[Notification]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            for n in batch:
+                f.write(json.dumps({"t": n.t, "kind": n.kind, "title": n.title, "body": n.body, "count": n.count},
+                                   ensure_ascii=False) + "\n")
+
+
+class StdoutSender(Sender):
+    def send(self, batch: List[Notification]) -> None:
+        msg = render(batch)
+        print(f"【{msg['title']}】\n{msg['desp']}", file=sys.stdout, flush=True)
+
+
+def make_sender(kind: Optional[str], push_key: Optional[str] = None, url: Optional[str] = None,
+                path: Optional[str] = None) -> Optional[Sender]:
+    """按配置创建推送通道；kind 为空时有 PUSH_KEY 就用 webhook，否则不推送"""
+    kind = kind or ("webhook" if push_key else None)
+    if kind == "webhook":
+        return WebhookSender(url, push_key)
+    if kind == "file":
+        return FileSender(path)
+    if kind == "stdout":
+        return StdoutSender()
+    if kind:
+        raise ValueError(f"未知的通知通道: {kind}")
+    return None
+
+
+_STOP = object()
+
+
+class Notifier:
+    """
+    异步通知：notify() 只往有界队列里放一条（满了直接丢弃），绝不阻塞调用方；
+    后台线程攒 batch_sec 秒的通知合成一批，按去重键合并，dedupe_sec 内发过的不再重复推送，
+    发送失败按指数退避重试 max_retries 次
+    """
+
+    def __init__(self, sender: Sender, queue_size: int = 100, batch_sec: float = 2.0, max_batch: int = 20,
+                 dedupe_sec: float = 3600, max_retries: int = 3, backoff: float = 1.0):
+        self.sender = sender
+        self.batch_sec, self.max_batch = batch_sec, max_batch
+        self.dedupe_sec = dedupe_sec
+        self.max_retries, self.backoff = max_retries, backoff
+        self.dropped = 0
+        self.sent = 0
+        self._q: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._recent: Dict[str, float] = {}
+        self._thread = threading.Thread(target=self._run, name="notifier", daemon=True)
+        self._thread.start()
+
+    def notify(self, kind: str, title: str, body: str = "", key: Optional[str] = None) -> bool:
+        try:
+            self._q.put_nowait(Notification(kind, title, body, key))
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def close(self, timeout: float = 5.0) -> None:
+        """把队列里剩下的通知发完再退出，最多等 timeout 秒"""
+        try:
+            self._q.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def _collect(self) -> Tuple[List[Notification], bool]:
+        first = self._q.get()
+        if first is _STOP:
+            return [], True
+        batch, deadline = [first], time.monotonic() + self.batch_sec
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                n = self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if n is _STOP:
+                return batch, True
+            batch.append(n)
+        return batch, False
+
+    def _dedupe(self, batch: List[Notification]) -> List[Notification]:
+        now = time.time()
+        merged: Dict[str, Notification] = {}
+        for n in batch:
+            k = n.dedupe_key
+            if k in merged:
+                merged[k].count += 1
+                merged[k].body = n.body or merged[k].body
+            elif now - self._recent.get(k, 0) >= self.dedupe_sec:
+                merged[k] = n
+        for k in merged:
+            self._recent[k] = now
+        # 去重表只留窗口内的键
+        self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_sec}
+        return list(merged.values())
+
+    def _deliver(self, batch: List[Notification]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sender.send(batch)
+                self.sent += len(batch)
+                return
+            except Exception as e:
+                if attempt == self.max_retries:
+                    logger.warning("通知发送失败，已放弃 %d 条: %s", len(batch), e)
+                    return
+                logger.debug("通知发送失败（第 %d 次），稍后重试: %s", attempt + 1, e)
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def _run(self) -> None:
+        while True:
+            batch, stop = self._collect()
+            batch = self._dedupe(batch)
+            if batch:
+                self._deliver(batch)
+            if stop:
+                return
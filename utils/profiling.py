@@ -0,0 +1,181 @@
+# auto_sign_backend/utils/profiling.py
+import os
+import sys
+import pstats
+import logging
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_NO_PHASE = nullcontext()
+# 3.12 起 cProfile 基于 sys.monitoring：同一时刻只能有一个 Profile 启用，但它能看到所有线程
+_MONITORING = sys.version_info >= (3, 12)
+# 快照本身的分配不算进阶段里
+_SNAPSHOT_FILTERS = (tracemalloc.Filter(False, tracemalloc.__file__),)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(_SNAPSHOT_FILTERS)
+
+
+class PhaseProfiler:
+    """
+    按阶段（启动、每次签到）包一层 cProfile / tracemalloc：每个阶段写一个 .prof（可用 pstats / snakeviz 打开）
+    和一个 .malloc.txt，日志里只打 top N（并行的阶段内存峰值是合在一起的）。两者都没打开时 phase() 直接返回同一个空上下文，没有额外开销。
+    同一时刻只对一个阶段做 CPU 剖析，与之重叠的阶段跳过 CPU 部分；剖析本身出错只记警告，不影响被剖析的代码
+    """
+
+    def __init__(self, out_dir: str = "profiles", cpu: bool = False, memory: bool = False, top: int = 10):
+        self.out_dir = out_dir
+        self.cpu, self.memory = cpu, memory
+        self.top = top
+        self.enabled = cpu or memory
+        self._seq = 0
+        self._prefix = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self._thread_profs: List[cProfile.Profile] = []
+        self._mem_phases = 0            # 正在进行的内存阶段数（签到线程池里可能重叠）
+        self._cpu_phase = None          # 正在做 CPU 剖析的阶段名
+        self._owns_tracing = False
+        self._lock = threading.Lock()
+        if self.enabled:
+            os.makedirs(out_dir, exist_ok=True)
+
+    def phase(self, name: str, threads: bool = False):
+        """threads=True 时阶段内新起的线程（如 bootstrap 的线程池）也各自挂上 cProfile，结果合并"""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._phase(name, threads)
+
+    def _path(self, seq: int, name: str, ext: str) -> str:
+        return os.path.join(self.out_dir, f"{self._prefix}-{seq:03d}-{name}{ext}")
+
+    def _thread_hook(self, frame, event, arg):
+        # 3.12 以前 cProfile 只看启用它的线程：新线程里的第一个事件换成这个线程自己的 cProfile
+        sys.setprofile(None)
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except Exception:
+            return
+        with self._lock:
+            self._thread_profs.append(prof)
+
+    def _start_cpu(self, name: str, threads: bool) -> Optional[cProfile.Profile]:
+        with self._lock:
+            if self._cpu_phase is not None:
+                logger.warning("阶段 %s 与正在剖析的阶段 %s 重叠，跳过 CPU 剖析", name, self._cpu_phase)
+                return None
+            self._cpu_phase = name
+        prof = cProfile.Profile()
+        try:
+            if threads and not _MONITORING:
+                threading.setprofile(self._thread_hook)
+            prof.enable()
+        except Exception:
+            self._stop_cpu(None)
+            raise
+        return prof
+
+    def _stop_cpu(self, prof: Optional[cProfile.Profile]) -> None:
+        if prof is not None:
+            prof.disable()
+        threading.setprofile(None)
+        with self._lock:
+            self._cpu_phase = None
+
+    def _start_memory(self) -> tracemalloc.Snapshot:
+        with self._lock:
+            if self._mem_phases == 0 and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._owns_tracing = True
+            self._mem_phases += 1
+        tracemalloc.reset_peak()
+        return _snapshot()
+
+    def _stop_memory(self) -> None:
+        with self._lock:
+            self._mem_phases -= 1
+            if self._mem_phases == 0 and self._owns_tracing:
+                tracemalloc.stop()
+                self._owns_tracing = False
+
+    @contextmanager
+    def _phase(self, name: str, threads: bool) -> Iterator[None]:
+        with self._lock:
+            self._seq += 1
+            seq = self._seq
+        prof = before = None
+        try:
+            if self.memory:
+                before = self._start_memory()
+            if self.cpu:
+                prof = self._start_cpu(name, threads)
+        except Exception as e:
+            logger.warning("阶段 %s 剖析启动失败，本阶段不剖析: %s", name, e)
+        try:
+            yield
+        finally:
+            try:
+                if prof is not None:
+                    self._stop_cpu(prof)
+                    self._dump_cpu(seq, name, prof)
+                if before is not None:
+                    self._dump_memory(seq, name, before)
+            except Exception as e:
+                logger.warning("阶段 %s 剖析结果输出失败: %s", name, e)
+            finally:
+                if before is not None:
+                    self._stop_memory()
+
+    def _dump_cpu(self, seq: int, name: str, prof: cProfile.Profile) -> None:
+        stats = pstats.Stats(prof)
+        with self._lock:
+            extra, self._thread_profs = self._thread_profs, []
+        for p in extra:
+            stats.add(p)
+        path = self._path(seq, name, ".prof")
+        stats.dump_stats(path)
+        rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)[:self.top]
+        logger.info("阶段 %s CPU 剖析（%d 个线程）共 %.1f ms，已写入 %s，自身耗时 top %d:", name, 1 + len(extra),
+                    stats.total_tt * 1000, path, len(rows))
+        for (filename, line, func), (cc, nc, tt, ct, _) in rows:
+            logger.info("  %8.2f ms  累计 %8.2f ms  %6d 次  %s:%d(%s)", tt * 1000, ct * 1000, nc,
+                        os.path.basename(filename), line, func)
+
+    def _dump_memory(self, seq: int, name: str, before: tracemalloc.Snapshot) -> None:
+        after = _snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        diff = after.compare_to(before, "lineno")
+        path = self._path(seq, name, ".malloc.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"# phase {name}, peak {peak} B\n")
+            f.writelines(f"{d}\n" for d in diff[:200])
+        logger.info("阶段 %s 内存：峰值 %.1f KiB，已写入 %s，增长 top %d:", name, peak / 1024, path,
+                    min(self.top, len(diff)))
+        for d in diff[:self.top]:
+            logger.info("  %+9.1f KiB  %6d 块  %s", d.size_diff / 1024, d.count_diff, d.traceback)
+
+    def report_startup(self) -> None:
+        """
+        用 python -X tracemalloc 启动时，tracemalloc 从解释器启动就在记录：
+        按文件汇总目前为止仍占用的内存，主要就是各模块 import 时分配的
+        """
+        if not self.memory or not tracemalloc.is_tracing():
+            return
+        self._seq += 1
+        stats = _snapshot().statistics("filename")
+        path = self._path(self._seq, "startup", ".malloc.txt")
+        with open(path, "w", encoding="utf-8") as f:
+            f.writelines(f"{s}\n" for s in stats[:200])
+        logger.info("启动阶段内存：共 %.1f KiB，已写入 %s，按文件 top %d:",
+                    sum(s.size for s in stats) / 1024, path, min(self.top, len(stats)))
+        for s in stats[:self.top]:
+            logger.info("  %9.1f KiB  %s", s.size / 1024, s.traceback)
+
+
+NO_PROFILER = PhaseProfiler()
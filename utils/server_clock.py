@@ -0,0 +1,141 @@
+# auto_sign_backend/utils/server_clock.py
+import math
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+from typing import Optional, Tuple
+
+from auto_sign_backend.utils.clock import Clock, REAL_CLOCK
+
+logger = logging.getLogger(__name__)
+
+
+class ServerClockEstimator:
+    """
+    用已有响应的 Date 头估计服务器时钟偏差（server - local）。
+    Date 只精确到秒，服务器是在本地发出请求和收到响应之间生成它的，所以每个样本给出
+    偏差的一个区间 [D - t_recv, D + 1 - t_send]；最近 window 个样本的区间取交集，
+    中点作为估计值，半宽就是误差上界。交集为空（本地时钟跳变 / 漂移）时丢掉最旧的样本
+    """
+
+    def __init__(self, window: int = 16, max_rtt: float = 2.0, clock: Clock = REAL_CLOCK):
+        self.clock = clock
+        self.max_rtt = max_rtt
+        self._samples: deque = deque(maxlen=window)
+        self._bounds: Optional[Tuple[float, float]] = None
+        self._last_rtt: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def on_request(self, stats) -> None:
+        """请求钩子（add_request_hook）：只用一次就成功、带 Date 头的响应"""
+        resp = stats.response
+        if resp is None or stats.attempts != 1:
+            return
+        # total_ms 从发出请求算到读完响应体，区间只会更宽，不会把真值排除在外
+        self.observe(resp.headers.get("Date"), stats.total_ms / 1000)
+
+    def observe(self, date_header: Optional[str], elapsed: float) -> bool:
+        """刚收到的响应：Date 头和从发出请求到现在的秒数"""
+        if not date_header:
+            return False
+        t_recv = self.clock.time()
+        return self.add_sample(date_header, t_recv - elapsed, t_recv)
+
+    def add_sample(self, date_header: str, t_send: float, t_recv: float) -> bool:
+        rtt = t_recv - t_send
+        if rtt < 0 or rtt > self.max_rtt:
+            return False
+        try:
+            d = parsedate_to_datetime(date_header).timestamp()
+        except (TypeError, ValueError):
+            return False
+        with self._lock:
+            self._samples.append((d - t_recv, d + 1 - t_send))
+            self._last_rtt = rtt
+            self._recompute()
+        return True
+
+    def _recompute(self) -> None:
+        while self._samples:
+            lo = max(s[0] for s in self._samples)
+            hi = min(s[1] for s in self._samples)
+            if lo <= hi:
+                self._bounds = (lo, hi)
+                return
+            self._samples.popleft()
+        self._bounds = None
+
+    @property
+    def offset(self) -> Optional[float]:
+        """服务器比本地快多少秒；还没有样本时为 None"""
+        b = self._bounds
+        return (b[0] + b[1]) / 2 if b else None
+
+    @property
+    def lower(self) -> Optional[float]:
+        """偏差区间下界：按它算出的服务器时间只会偏慢，不会偏快"""
+        b = self._bounds
+        return b[0] if b else None
+
+    @property
+    def error(self) -> Optional[float]:
+        """offset 的误差上界（秒）"""
+        b = self._bounds
+        return (b[1] - b[0]) / 2 if b else None
+
+    @property
+    def samples(self) -> int:
+        return len(self._samples)
+
+    @property
+    def rtt(self) -> Optional[float]:
+        return self._last_rtt
+
+    def probe_delay(self) -> float:
+        """
+        距下一次"对准"的发送时刻还有多少秒：按当前估计，请求到达时服务器恰好跨秒，
+        返回的 Date 落在哪一秒就能把偏差区间砍掉一半（精度受 RTT/2 限制）
+        """
+        b, rtt = self._bounds, self._last_rtt or 0.0
+        if b is None:
+            return 0.0
+        x = self.clock.time() + rtt / 2 + (b[0] + b[1]) / 2
+        delay = math.ceil(x) - x
+        return delay if delay >= 0.02 else delay + 1
+
+    def describe(self) -> str:
+        if self._bounds is None:
+            return "暂无样本"
+        return "%+.3f s（±%.3f s，%d 个样本，RTT %.0f ms）" % (
+            self.offset, self.error, self.samples, (self._last_rtt or 0) * 1000)
+
+
+class ServerTimeClock(Clock):
+    """
+    按估计的服务器时间报时的时钟：now()/time() = 本地时间 + 偏差，sleep/wait 交给底层时钟。
+    签到窗口由服务器时间判定，调度器用它就会在服务器时间到点时触发。
+    conservative=True（默认）时取偏差区间下界，事件最多晚 2 倍误差触发，但不会早于服务器上的窗口
+    """
+
+    def __init__(self, base: Clock, estimator: ServerClockEstimator, conservative: bool = True):
+        self.base = base
+        self.estimator = estimator
+        self.conservative = conservative
+
+    def _offset(self) -> float:
+        off = self.estimator.lower if self.conservative else self.estimator.offset
+        return off or 0.0
+
+    def now(self) -> datetime:
+        return self.base.now() + timedelta(seconds=self._offset())
+
+    def time(self) -> float:
+        return self.base.time() + self._offset()
+
+    def sleep(self, seconds: float) -> None:
+        self.base.sleep(seconds)
+
+    def wait(self, cond: threading.Condition, timeout: Optional[float] = None) -> None:
+        self.base.wait(cond, timeout)
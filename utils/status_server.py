@@ -0,0 +1,122 @@
+# auto_sign_backend/utils/status_server.py
+import os
+import json
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+from auto_sign_backend.utils.metrics import MetricsRegistry, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+
+class StatusBoard:
+    """
+    签到进程的状态快照。写入方（调度线程）每次复制一份新 dict 再整体替换引用，
+    读取方（HTTP 线程）直接拿当前引用，不加锁，也不会读到写了一半的状态
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.last_request_ok: Optional[float] = None
+        self._write_lock = threading.Lock()    # 只在写入方之间互斥
+        self._snap: Dict[str, Any] = {"state": "starting", "courses": [], "updated_at": self.started_at}
+
+    @property
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snap
+
+    def publish(self, **fields) -> None:
+        """在当前快照上覆盖若干字段后整体替换"""
+        with self._write_lock:
+            snap = dict(self._snap)
+            snap.update(fields)
+            snap["updated_at"] = time.time()
+            self._snap = snap
+
+    def on_request(self, stats) -> None:
+        """请求钩子：记录最近一次成功请求的时刻"""
+        if stats.outcome == "ok":
+            self.last_request_ok = time.time()
+
+    def status(self) -> Dict[str, Any]:
+        snap = self._snap
+        return {**snap, "pid": os.getpid(), "started_at": self.started_at,
+                "uptime_sec": round(time.time() - self.started_at, 1),
+                "last_request_ok": self.last_request_ok}
+
+    def to_prometheus(self) -> str:
+        snap = self._snap
+        by_state: Dict[str, int] = {}
+        for c in snap.get("courses", []):
+            by_state[c["state"]] = by_state.get(c["state"], 0) + 1
+        lines = ["# HELP auto_sign_courses 今日课程按签到状态计数", "# TYPE auto_sign_courses gauge"]
+        lines += [f'auto_sign_courses{{state="{s}"}} {n}' for s, n in sorted(by_state.items())]
+        lines += ["# HELP auto_sign_start_time_seconds 进程启动时刻（unix 秒）", "# TYPE auto_sign_start_time_seconds gauge",
+                  f"auto_sign_start_time_seconds {self.started_at:.3f}"]
+        if self.last_request_ok is not None:
+            lines += ["# TYPE auto_sign_last_request_ok_timestamp_seconds gauge",
+                      f"auto_sign_last_request_ok_timestamp_seconds {self.last_request_ok:.3f}"]
+        nxt = snap.get("next_event")
+        if nxt and nxt.get("ts") is not None:
+            lines += ["# TYPE auto_sign_next_event_timestamp_seconds gauge",
+                      f"auto_sign_next_event_timestamp_seconds {nxt['ts']:.3f}"]
+        return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    board: StatusBoard = None
+    registry: MetricsRegistry = None
+
+    def log_message(self, fmt, *args):
+        logger.debug("status %s", fmt % args)
+
+    def _send(self, code: int, body: str, ctype: str) -> None:
+        data = body.encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/healthz":
+            self._send(200, "ok\n", "text/plain; charset=utf-8")
+        elif path == "/status":
+            self._send(200, json.dumps(self.board.status(), ensure_ascii=False, default=str),
+                       "application/json; charset=utf-8")
+        elif path == "/metrics":
+            body = self.registry.to_prometheus().lstrip("\n") + self.board.to_prometheus()
+            self._send(200, body, "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send(404, "not found\n", "text/plain; charset=utf-8")
+
+
+class StatusServer:
+    """后台线程里的状态服务：/healthz、/status（JSON）、/metrics（Prometheus 文本）"""
+
+    def __init__(self, board: StatusBoard, host: str = "127.0.0.1", port: int = 0,
+                 registry: MetricsRegistry = REGISTRY):
+        handler = type("StatusHandler", (_Handler,), {"board": board, "registry": registry})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StatusServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name="status-server", daemon=True)
+        self._thread.start()
+        logger.info("状态服务已启动: %s（/healthz /status /metrics）", self.url)
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -3,4 +3,8 @@ from datetime import datetime
 
 def parse_time(s: str) -> datetime:
     # 兼容原脚本的时间格式 "%Y-%m-%d %H:%M:%S"
-    return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")
+    # fromisoformat 是 C 实现，比 strptime 快一个数量级；格式不规范时再退回 strptime
+    try:
+        return datetime.fromisoformat(s)
+    except (TypeError, ValueError):
+        return datetime.strptime(s, "%Y-%m-%d %H:%M:%S")